@@ -138,8 +138,8 @@ class AdvancedFundingRateScheduler:
         except Exception as e:
             self.logger.error(f"Error categorizing symbols: {e}")
             # Fallback: all to 8h with 1h monitoring
-            self.symbols_1h = self.symbols.copy()
-            self.symbols_8h = self.symbols.copy()
+            self.symbols_1h = list(self.symbols)
+            self.symbols_8h = list(self.symbols)
             self.symbols_4h = []
     
     def _setup_funding_schedules(self):
@@ -1,3 +1,5 @@
+import threading
+
 from pymongo import MongoClient
 from src.config.config_variable import MONGO_CONFIG
 
@@ -6,6 +8,7 @@ class ConfigMongo:
     """Singleton class để cấu hình kết nối MongoDB"""
 
     _instance = None
+    _lock = threading.Lock()
 
     def _init_config(self):
         self._config = {
@@ -14,6 +17,10 @@ class ConfigMongo:
             "user": MONGO_CONFIG["user"],
             "pass": MONGO_CONFIG["pass"],
             "auth": MONGO_CONFIG["auth"],
+            "max_pool_size": MONGO_CONFIG["max_pool_size"],
+            "min_pool_size": MONGO_CONFIG["min_pool_size"],
+            "max_idle_time_ms": MONGO_CONFIG["max_idle_time_ms"],
+            "compressors": MONGO_CONFIG["compressors"],
         }
 
     @property
@@ -22,9 +29,12 @@ class ConfigMongo:
 
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super(ConfigMongo, cls).__new__(cls)
-            cls._instance._init_config()
-            cls._instance._client = None
+            with cls._lock:
+                if cls._instance is None:
+                    instance = super(ConfigMongo, cls).__new__(cls)
+                    instance._init_config()
+                    instance._client = None
+                    cls._instance = instance
         return cls._instance
 
     def get_client(self):
@@ -33,12 +43,23 @@ class ConfigMongo:
         Returns:
             MongoClient object
         """
-        if self._client is None:
-            self._client = MongoClient(
-                host=self.get_config["host"],
-                port=self.get_config["port"],
-                username=self.get_config["user"],
-                password=self.get_config["pass"],
-                authSource=self.get_config["auth"],
-            )
+        if self._client is not None:
+            return self._client
+
+        # Các LoadMongo tạo từ nhiều thread cùng lúc vẫn chỉ dùng một connection pool
+        with self._lock:
+            if self._client is None:
+                self._client = MongoClient(
+                    host=self.get_config["host"],
+                    port=self.get_config["port"],
+                    username=self.get_config["user"],
+                    password=self.get_config["pass"],
+                    authSource=self.get_config["auth"],
+                    maxPoolSize=self.get_config["max_pool_size"],
+                    minPoolSize=self.get_config["min_pool_size"],
+                    maxIdleTimeMS=self.get_config["max_idle_time_ms"],
+                    retryWrites=True,
+                    w=1,
+                    compressors=self.get_config["compressors"],
+                )
         return self._client
@@ -10,6 +10,13 @@ MONGO_CONFIG = {
     "user": os.getenv("MONGO_USER"),
     "pass": os.getenv("MONGO_PASS"),
     "auth": os.getenv("MONGO_AUTH", "admin"),
+    # Connection pool: giữ sẵn kết nối cho bulk write song song và realtime writer
+    "max_pool_size": int(os.getenv("MONGO_MAX_POOL_SIZE", "200")),
+    "min_pool_size": int(os.getenv("MONGO_MIN_POOL_SIZE", "10")),
+    "max_idle_time_ms": int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000")),
+    # Nén wire protocol cho bulk payload (server cần bật net.compression.compressors,
+    # mặc định có sẵn ở MongoDB mới; zstd cần package zstandard, snappy cần python-snappy nên không bật mặc định)
+    "compressors": os.getenv("MONGO_COMPRESSORS", "zstd,zlib"),
 }
 
 TELE_CONFIG = {
@@ -38,4 +45,6 @@ SYSTEM_CONFIG = {
     "history_update_interval": int(os.getenv("HISTORY_UPDATE_INTERVAL", "3600")),
     "monitoring_interval": int(os.getenv("MONITORING_INTERVAL", "3600")),  
     "max_symbols_per_websocket": int(os.getenv("MAX_SYMBOLS_PER_WS", "200")),
+    # Vòng cập nhật lịch sử định kỳ của manager (nguồn cập nhật history duy nhất sau lần trích xuất ban đầu)
+    "enable_backup_incremental": os.getenv("ENABLE_BACKUP_INCREMENTAL", "true").lower() == "true",
 }
@@ -1,3 +1,4 @@
+import heapq
 import requests
 import time
 import threading
@@ -62,8 +63,10 @@ class ExtractFundingRateHistory:
                 not in self.BLACKLISTED_SYMBOLS  # Lọc các symbol bị blacklist
             ]
 
-            # Sắp xếp theo khối lượng quote 24h (giảm dần)
-            usdt_symbols.sort(key=lambda x: float(x["quoteVolume"]), reverse=True)
+            # Chỉ cần top `limit` theo khối lượng quote 24h (giảm dần) - không sort toàn bộ
+            usdt_symbols = heapq.nlargest(
+                limit, usdt_symbols, key=lambda x: float(x["quoteVolume"])
+            )
 
             symbols = [item["symbol"] for item in usdt_symbols[:limit-3]]  # Leave space for test symbols
             
@@ -113,21 +116,22 @@ class ExtractFundingRateHistory:
             Đối tượng Response
         """
         with self._request_lock:
-            # Tính thời gian kể từ yêu cầu cuối cùng
+            # Đặt trước slot gửi kế tiếp, cách slot trước ít nhất min_request_interval
             current_time = time.time()
-            time_since_last = current_time - self._last_request_time
-
-            # Chờ nếu cần để duy trì khoảng thời gian tối thiểu
-            if time_since_last < self._min_request_interval:
-                sleep_time = self._min_request_interval - time_since_last
-                self.logger.debug(f"Rate limiting: sleeping {sleep_time:.2f} seconds")
-                time.sleep(sleep_time)
+            scheduled_time = max(
+                current_time, self._last_request_time + self._min_request_interval
+            )
+            self._last_request_time = scheduled_time
 
-            # Thực hiện yêu cầu
-            response = self.session.get(url, params=params, timeout=30)
-            self._last_request_time = time.time()
+        # Chờ tới slot của mình ngoài lock để các worker khác có thể đặt slot
+        # và các request đang chạy được chồng lấp độ trễ mạng
+        sleep_time = scheduled_time - current_time
+        if sleep_time > 0:
+            self.logger.debug(f"Rate limiting: sleeping {sleep_time:.2f} seconds")
+            time.sleep(sleep_time)
 
-            return response
+        # Thực hiện yêu cầu
+        return self.session.get(url, params=params, timeout=30)
 
     def _find_symbol_start_time(self, symbol: str) -> int:
         """Tự động tìm thời điểm bắt đầu có dữ liệu cho một symbol
@@ -367,12 +371,17 @@ class ExtractFundingRateHistory:
             self.logger.error(f"Error getting funding rate history for {symbol}: {e}")
             return []
 
-    def extract_all_history(self, symbols: List[str], days_back: int = 30) -> bool:
+    def extract_all_history(
+        self, symbols: List[str], days_back: int = 30, max_workers: int = 3
+    ) -> bool:
         """Extract funding rate history for all symbols using multiple threads
 
         Args:
             symbols: List of symbols to extract
             days_back: Number of days to go back in history (only for first time)
+            max_workers: Number of concurrent worker threads. Requests are still
+                spaced by the shared rate limiter, workers only overlap network
+                latency and MongoDB writes
 
         Returns:
             True if successful, False otherwise
@@ -383,14 +392,25 @@ class ExtractFundingRateHistory:
             )
 
             success_count = 0
-            max_workers = 3  # Limit concurrent threads to avoid overwhelming API
+
+            # Lấy thời gian funding mới nhất của tất cả symbols trong một truy vấn
+            # (None khi lỗi: từng symbol tự kiểm tra như trước)
+            latest_times = self.load_mongo.get_latest_funding_times(symbols)
 
             # Use ThreadPoolExecutor for concurrent processing
             with ThreadPoolExecutor(max_workers=max_workers) as executor:
                 # Submit all symbol processing tasks
                 future_to_symbol = {
                     executor.submit(
-                        self._process_single_symbol, symbol, i, len(symbols)
+                        self._process_single_symbol,
+                        symbol,
+                        i,
+                        len(symbols),
+                        (
+                            latest_times.get(symbol, 0)
+                            if latest_times is not None
+                            else None
+                        ),
                     ): symbol
                     for i, symbol in enumerate(symbols)
                 }
@@ -417,7 +437,11 @@ class ExtractFundingRateHistory:
             return False
 
     def _process_single_symbol(
-        self, symbol: str, symbol_index: int, total_symbols: int
+        self,
+        symbol: str,
+        symbol_index: int,
+        total_symbols: int,
+        latest_time: Optional[int] = None,
     ) -> bool:
         """Process a single symbol for history extraction
 
@@ -425,6 +449,8 @@ class ExtractFundingRateHistory:
             symbol: Symbol to process
             symbol_index: Index of symbol (for logging)
             total_symbols: Total number of symbols
+            latest_time: Latest stored funding time (ms) if already known,
+                0 when the symbol has no data; queried from MongoDB when None
 
         Returns:
             True if successful, False otherwise
@@ -433,7 +459,10 @@ class ExtractFundingRateHistory:
             self.logger.info(f"Processing {symbol} ({symbol_index+1}/{total_symbols})")
 
             # Check if this is first time extraction (no data exists)
-            is_first_time = not self.load_mongo.has_funding_data(symbol)
+            if latest_time is None:
+                is_first_time = not self.load_mongo.has_funding_data(symbol)
+            else:
+                is_first_time = latest_time == 0
 
             if is_first_time:
                 # Lần đầu: trích xuất TOÀN BỘ lịch sử từ thời điểm bắt đầu
@@ -511,7 +540,7 @@ class ExtractFundingRateHistory:
                         f"Full history for {symbol}: {len(all_data)} records from {first_date} to {last_date}"
                     )
 
-                    if self.transform_and_save_data(all_data, symbol):
+                    if self.transform_and_save_data(all_data, symbol, known_new=True):
                         self.logger.info(
                             f"Successfully processed {len(all_data)} records for {symbol} (full history)"
                         )
@@ -528,7 +557,8 @@ class ExtractFundingRateHistory:
                 self.logger.info(
                     f"Incremental extraction for {symbol} - retrieving latest 8 hours"
                 )
-                latest_time = self.load_mongo.get_latest_funding_time(symbol)
+                if not latest_time:
+                    latest_time = self.load_mongo.get_latest_funding_time(symbol)
 
                 # Lấy dữ liệu từ thời gian funding cuối + 1ms đến hiện tại
                 end_time = self.util_datetime.get_current_timestamp()
@@ -544,7 +574,10 @@ class ExtractFundingRateHistory:
                 data = self.get_funding_rate_history(symbol, start_time, end_time, 10)
 
                 if data:
-                    if self.transform_and_save_data(data, symbol):
+                    # Dữ liệu lấy từ sau thời gian funding mới nhất nên chắc chắn là mới
+                    if self.transform_and_save_data(
+                        data, symbol, known_new=bool(latest_time)
+                    ):
                         self.logger.info(
                             f"Successfully processed {len(data)} new records for {symbol}"
                         )
@@ -560,11 +593,17 @@ class ExtractFundingRateHistory:
             self.logger.error(f"Error processing {symbol}: {e}")
             return False
 
-    def extract_recent_history(self, symbols: List[str]) -> bool:
+    def extract_recent_history(
+        self, symbols: List[str], batch_size: Optional[int] = None
+    ) -> bool:
         """Extract recent funding rate history (last 24 hours)
 
+        Records of all symbols are collected first and written with one
+        unordered bulk write per batch instead of one write per symbol.
+
         Args:
             symbols: List of symbols to extract
+            batch_size: Number of operations per MongoDB bulk write (sized from the records by default)
 
         Returns:
             True if successful, False otherwise
@@ -579,6 +618,8 @@ class ExtractFundingRateHistory:
             start_time = end_time - (24 * 60 * 60 * 1000)
 
             success_count = 0
+            pending_data = []
+            pending_symbols = 0
 
             for symbol in symbols:
                 try:
@@ -587,8 +628,8 @@ class ExtractFundingRateHistory:
                     )
 
                     if data:
-                        if self.transform_and_save_data(data, symbol):
-                            success_count += 1
+                        pending_data.extend(data)
+                        pending_symbols += 1
 
                     time.sleep(0.1)  # Rate limiting
 
@@ -598,6 +639,11 @@ class ExtractFundingRateHistory:
                     )
                     continue
 
+            if pending_data and self.transform_and_save_data(
+                pending_data, f"{pending_symbols} symbols", batch_size=batch_size
+            ):
+                success_count = pending_symbols
+
             self.logger.info(
                 f"Recent history extraction completed. Success: {success_count}/{len(symbols)}"
             )
@@ -703,13 +749,19 @@ class ExtractFundingRateHistory:
             return False
 
     def transform_and_save_data(
-        self, raw_data: List[Dict[str, Any]], symbol: str
+        self,
+        raw_data: List[Dict[str, Any]],
+        symbol: str,
+        batch_size: Optional[int] = None,
+        known_new: bool = False,
     ) -> bool:
         """Transform raw data and save to MongoDB
 
         Args:
             raw_data: Raw funding rate data
             symbol: Trading symbol
+            batch_size: Number of operations per MongoDB bulk write (sized from the records by default)
+            known_new: True when none of the records are stored yet (insert instead of upsert)
 
         Returns:
             True if successful, False otherwise
@@ -727,7 +779,12 @@ class ExtractFundingRateHistory:
                 return False
 
             # Save transformed data to MongoDB
-            if self.load_mongo.save_transformed_funding_data(transformed_data):
+            if self.load_mongo.save_transformed_funding_data(
+                transformed_data,
+                batch_size=batch_size,
+                known_new=known_new,
+                preformatted=True,
+            ):
                 self.logger.info(
                     f"Successfully saved {len(transformed_data)} transformed records for {symbol}"
                 )
@@ -1,10 +1,11 @@
+import atexit
+import queue
 import requests
-import time
+import sys
 import schedule
 import threading
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set
 from datetime import datetime, timezone
-import traceback
 
 from src.config.config_logging import ConfigLogging
 from src.config.config_variable import REALTIME_CONFIG, SYSTEM_CONFIG
@@ -13,10 +14,36 @@ from src.transform.transform_funding import TransformFundingData
 from src.utils.util_tele_bot_check import UtilTeleBotCheck
 from src.utils.funding_interval_detector import FundingIntervalDetector
 
+# Session HTTP dùng chung cho mọi extractor trong process (giữ pool khi restart)
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    """Lấy session HTTP dùng chung, tạo mới ở lần gọi đầu tiên
+
+    Returns:
+        Đối tượng requests.Session
+    """
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                _SESSION = requests.Session()
+                atexit.register(_SESSION.close)
+    return _SESSION
+
 
 class ExtractFundingRateRealtime:
     """Trích xuất dữ liệu tỷ lệ funding từ Binance REST API với các cập nhật theo lịch"""
 
+    # Giờ funding (UTC) của từng chu kỳ
+    FUNDING_HOURS_8H = (0, 8, 16)
+    FUNDING_HOURS_4H = (0, 4, 8, 12, 16, 20)
+
+    # Sentinel dừng luồng gửi thông báo
+    _NOTIFY_STOP = object()
+
     def __init__(self):
         self.logger = ConfigLogging.config_logging("ExtractFundingRateRealtime")
         self.load_mongo = LoadMongo()
@@ -29,16 +56,71 @@ class ExtractFundingRateRealtime:
         # Cấu hình
         self.config = REALTIME_CONFIG
         self.base_url = "https://fapi.binance.com"
+
+        # Giữ kết nối keep-alive tới Binance thay vì mở TCP/TLS mới mỗi lần gọi
+        # Session là singleton cấp module nên restart manager không tạo lại pool
+        self.session = _get_session()
         
         # Trạng thái và quản lý
         self.is_running = False
-        self.symbols = []
+        self.symbols = ()
         self.scheduler_thread = None
         self.last_update_time = None
+
+        # Scheduler riêng của extractor để không dùng chung job list toàn cục
+        self.scheduler = schedule.Scheduler()
+        self._stop_event = threading.Event()
         
         # Các symbol theo chu kỳ funding khác nhau
-        self.symbols_8h = []  # Chu kỳ chuẩn 8 giờ
-        self.symbols_4h = []  # Chu kỳ 4 giờ
+        self.symbols_8h = ()  # Chu kỳ chuẩn 8 giờ
+        self.symbols_4h = ()  # Chu kỳ 4 giờ
+
+        # Hàng đợi thông báo Telegram - gửi ở luồng riêng để không chặn chu kỳ cập nhật
+        self._notify_queue = queue.Queue(maxsize=128)
+        self._notify_thread = None
+        self._start_notifier()
+
+    def _start_notifier(self):
+        """Khởi động luồng gửi thông báo Telegram nếu chưa chạy"""
+        if self._notify_thread and self._notify_thread.is_alive():
+            return
+        self._notify_thread = threading.Thread(
+            target=self._notification_worker, daemon=True
+        )
+        self._notify_thread.start()
+
+    def _notification_worker(self):
+        """Lấy tin nhắn từ hàng đợi và gửi qua Telegram"""
+        while True:
+            message = self._notify_queue.get()
+            if message is self._NOTIFY_STOP:
+                break
+            try:
+                self.tele_bot.send_message(message)
+            except Exception as e:
+                self.logger.error(f"Error sending queued notification: {e}")
+
+    def _notify(self, message: str):
+        """Đưa thông báo vào hàng đợi, bỏ qua nếu hàng đợi đầy
+
+        Args:
+            message: Nội dung tin nhắn
+        """
+        try:
+            self._notify_queue.put_nowait(message)
+        except queue.Full:
+            self.logger.warning("Notification queue full, dropping message")
+
+    def _stop_notifier(self, timeout: float = 10):
+        """Gửi nốt các thông báo còn lại rồi dừng luồng gửi"""
+        if not self._notify_thread or not self._notify_thread.is_alive():
+            return
+        try:
+            self._notify_queue.put(self._NOTIFY_STOP, timeout=timeout)
+        except queue.Full:
+            self.logger.warning("Notification queue full, notifier not flushed")
+            return
+        self._notify_thread.join(timeout=timeout)
 
     def start_realtime_extraction(self, symbols: List[str]) -> bool:
         """Bắt đầu trích xuất tỷ lệ funding theo lịch
@@ -58,8 +140,11 @@ class ExtractFundingRateRealtime:
                 self.logger.error("No symbols provided for realtime extraction")
                 return False
 
-            self.symbols = symbols[:100]  # Top 100 symbols
+            # Top 100 symbols - tuple chỉ đọc, intern để so sánh symbol nhanh hơn
+            self.symbols = tuple(sys.intern(s) for s in symbols[:100])
             self.is_running = True
+            self._stop_event.clear()
+            self._start_notifier()
             
             # Phân loại các symbol theo tần suất funding
             self._categorize_symbols_by_funding_frequency()
@@ -83,7 +168,7 @@ class ExtractFundingRateRealtime:
             threading.Thread(target=self._initial_update, daemon=True).start()
 
             # Gửi thông báo ban đầu
-            self.tele_bot.send_message(
+            self._notify(
                 f"Funding Rate Realtime Extraction Started\n"
                 f"Monitoring {len(self.symbols)} symbols\n"
                 f"8-hour symbols: {len(self.symbols_8h)}\n"
@@ -112,14 +197,18 @@ class ExtractFundingRateRealtime:
 
             self.logger.info("Stopping realtime extraction")
             self.is_running = False
+            self._stop_event.set()
             
             # Xóa các lịch
-            schedule.clear()
+            self.scheduler.clear()
             
             # Chờ luồng scheduler kết thúc
             if self.scheduler_thread and self.scheduler_thread.is_alive():
                 self.scheduler_thread.join(timeout=10)
 
+            # Gửi nốt các thông báo đang chờ
+            self._stop_notifier()
+
             self.logger.info("Realtime extraction stopped successfully")
             return True
 
@@ -136,17 +225,20 @@ class ExtractFundingRateRealtime:
             intervals = self.interval_detector.detect_funding_intervals(self.symbols)
             
             # Reset lại danh sách symbol
-            self.symbols_8h = []
-            self.symbols_4h = []
+            symbols_8h = []
+            symbols_4h = []
 
             # Phân loại symbol dựa trên kết quả phát hiện
             for symbol in self.symbols:
                 interval = intervals.get(symbol, "8h")  # Mặc định là 8h nếu không phát hiện được
 
                 if interval == "4h":
-                    self.symbols_4h.append(symbol)
+                    symbols_4h.append(symbol)
                 else:
-                    self.symbols_8h.append(symbol)
+                    symbols_8h.append(symbol)
+
+            self.symbols_8h = tuple(symbols_8h)
+            self.symbols_4h = tuple(symbols_4h)
             
             # Ghi log kết quả
             self.logger.info(f"Funding interval detection completed:")
@@ -159,32 +251,27 @@ class ExtractFundingRateRealtime:
             
             # Hiển thị một vài ví dụ
             if self.symbols_4h:
-                self.logger.info(f"4h symbols examples: {self.symbols_4h[:5]}")
+                self.logger.info(f"4h symbols examples: {list(self.symbols_4h[:5])}")
             if self.symbols_8h:
-                self.logger.info(f"8h symbols examples: {self.symbols_8h[:5]}")
+                self.logger.info(f"8h symbols examples: {list(self.symbols_8h[:5])}")
                 
         except Exception as e:
             self.logger.error(f"Error in intelligent funding interval detection: {e}")
             # Fallback về cách làm thận trọng
-            self.symbols_8h = self.symbols.copy()
-            self.symbols_4h = []
+            self.symbols_8h = self.symbols
+            self.symbols_4h = ()
             self.logger.warning("Fallback: All symbols set to 8h funding")
 
     def _setup_schedules(self):
         """Thiết lập các job theo lịch để cập nhật tỷ lệ funding"""
         try:
             # Lên lịch cập nhật 8 giờ vào 00:00, 08:00, 16:00 UTC
-            schedule.every().day.at("00:00").do(self._update_8h_symbols)
-            schedule.every().day.at("08:00").do(self._update_8h_symbols)
-            schedule.every().day.at("16:00").do(self._update_8h_symbols)
-            
+            for hour in self.FUNDING_HOURS_8H:
+                self.scheduler.every().day.at(f"{hour:02d}:00").do(self._update_8h_symbols)
+
             # Lên lịch cập nhật 4 giờ vào 00:00, 04:00, 08:00, 12:00, 16:00, 20:00 UTC
-            schedule.every().day.at("00:00").do(self._update_4h_symbols)
-            schedule.every().day.at("04:00").do(self._update_4h_symbols)
-            schedule.every().day.at("08:00").do(self._update_4h_symbols)
-            schedule.every().day.at("12:00").do(self._update_4h_symbols)
-            schedule.every().day.at("16:00").do(self._update_4h_symbols)
-            schedule.every().day.at("20:00").do(self._update_4h_symbols)
+            for hour in self.FUNDING_HOURS_4H:
+                self.scheduler.every().day.at(f"{hour:02d}:00").do(self._update_4h_symbols)
             
             self.logger.info("Schedules setup completed")
             
@@ -195,11 +282,17 @@ class ExtractFundingRateRealtime:
         """Vòng lặp chạy scheduler"""
         while self.is_running:
             try:
-                schedule.run_pending()
-                time.sleep(60)  # Kiểm tra mỗi phút
+                self.scheduler.run_pending()
+
+                # Ngủ tới job kế tiếp (tối đa 60s) thay vì thức dậy mỗi phút
+                idle = self.scheduler.idle_seconds
+                sleep_for = 60 if idle is None else max(0.5, min(idle, 60))
+                if self._stop_event.wait(timeout=sleep_for):
+                    break
             except Exception as e:
                 self.logger.error(f"Error in scheduler loop: {e}")
-                time.sleep(60)
+                if self._stop_event.wait(timeout=60):
+                    break
 
     def _update_8h_symbols(self):
         """Cập nhật tỷ lệ funding cho các symbol chu kỳ 8 giờ"""
@@ -223,31 +316,64 @@ class ExtractFundingRateRealtime:
         except Exception as e:
             self.logger.error(f"Error updating 4h symbols: {e}")
 
-    def _fetch_and_update_funding_rates(self, symbols: List[str], interval: str):
+    def _fetch_and_update_funding_rates(self, symbols: List[str], interval: str) -> Set[str]:
         """Lấy và cập nhật tỷ lệ funding cho các symbol được chỉ định
 
         Args:
             symbols: Danh sách symbol cần cập nhật
             interval: Chu kỳ funding (4h hoặc 8h)
+
+        Returns:
+            Tập symbol đã ghi vào MongoDB (rỗng nếu lỗi)
+        """
+        data = self._fetch_premium_index()
+        if data is None:
+            return set()
+        return self._update_funding_rates(data, symbols, interval)
+
+    def _fetch_premium_index(self) -> Optional[List[Dict[str, Any]]]:
+        """Lấy premiumIndex của toàn bộ thị trường (một request, dùng chung cho nhiều batch)
+
+        Returns:
+            Danh sách dòng premiumIndex hoặc None nếu lỗi
         """
         try:
             # Lấy dữ liệu funding hiện tại từ API
             url = f"{self.base_url}/fapi/v1/premiumIndex"
-            response = requests.get(url, timeout=30)
+            response = self.session.get(url, timeout=(5, 15))
             
             if response.status_code != 200:
                 self.logger.error(f"API request failed with status {response.status_code}")
-                return
+                return None
                 
-            data = response.json()
+            return response.json()
             
+        except Exception as e:
+            self.logger.exception(f"Error fetching premiumIndex: {e}")
+            return None
+
+    def _update_funding_rates(self, data: List[Dict[str, Any]], symbols: List[str], interval: str) -> Set[str]:
+        """Lọc, biến đổi và ghi tỷ lệ funding của các symbol từ premiumIndex đã lấy
+
+        Args:
+            data: Dòng premiumIndex của toàn bộ thị trường (từ _fetch_premium_index)
+            symbols: Danh sách symbol cần cập nhật
+            interval: Chu kỳ funding (4h hoặc 8h)
+
+        Returns:
+            Tập symbol đã ghi vào MongoDB (rỗng nếu lỗi)
+        """
+        try:
             # Lọc dữ liệu cho các symbol của chúng ta
+            # premiumIndex trả về toàn bộ thị trường nên tra cứu bằng set, không quét list
+            wanted = frozenset(symbols)
             filtered_data = []
             for item in data:
-                if item['symbol'] in symbols:
+                symbol = sys.intern(item['symbol'])
+                if symbol in wanted:
                     # Chuyển đổi response API về định dạng của chúng ta
                     funding_data = {
-                        'symbol': item['symbol'],
+                        'symbol': symbol,
                         'interval': interval,
                         'time_to_next_funding': item.get('nextFundingTime', 0),
                         'funding_rate': float(item.get('lastFundingRate', 0)),
@@ -257,13 +383,12 @@ class ExtractFundingRateRealtime:
                         'estimated_settle_price': float(item.get('estimatedSettlePrice', 0)),
                         'funding_cap': 0.005,  # Ngưỡng funding tối đa chuẩn Binance
                         'funding_floor': -0.005,  # Ngưỡng funding tối thiểu chuẩn Binance
-                        'last_update_time': int(time.time() * 1000)
                     }
                     filtered_data.append(funding_data)
             
             if not filtered_data:
                 self.logger.warning(f"No data received for {interval} symbols")
-                return
+                return set()
                 
             # Biến đổi dữ liệu
             transformed_data = self.transform_funding.transform_realtime_funding_data(filtered_data)
@@ -281,20 +406,22 @@ class ExtractFundingRateRealtime:
                     
                     # Gửi thông báo cho các cập nhật đáng kể
                     if len(transformed_data) > 50:
-                        self.tele_bot.send_message(
+                        self._notify(
                             f"Funding Rate Update Complete\n"
                             f"Interval: {interval}\n"
                             f"Updated: {len(transformed_data)} symbols\n"
                             f"Time: {self.last_update_time.strftime('%Y-%m-%d %H:%M:%S')} UTC"
                         )
+                    return {record["symbol"] for record in transformed_data}
                 else:
                     self.logger.error(f"Failed to update {interval} funding data")
             else:
                 self.logger.warning(f"No transformed data for {interval} symbols")
+            return set()
                 
         except Exception as e:
-            self.logger.error(f"Error fetching and updating {interval} funding rates: {e}")
-            traceback.print_exc()
+            self.logger.exception(f"Error updating {interval} funding rates: {e}")
+            return set()
 
     def get_status(self) -> Dict[str, Any]:
         """Lấy trạng thái trích xuất realtime
@@ -309,14 +436,14 @@ class ExtractFundingRateRealtime:
                 "symbols_count": len(self.symbols),
                 "symbols_8h_count": len(self.symbols_8h),
                 "symbols_4h_count": len(self.symbols_4h),
-                "symbols": self.symbols[:10] if self.symbols else [],
+                "symbols": list(self.symbols[:10]),
                 "last_update_time": self.last_update_time.isoformat() if self.last_update_time else None,
                 "scheduler_thread_alive": (
                     self.scheduler_thread.is_alive()
                     if self.scheduler_thread
                     else False
                 ),
-                "next_scheduled_jobs": len(schedule.jobs),
+                "next_scheduled_jobs": len(self.scheduler.jobs),
             }
 
         except Exception as e:
@@ -339,12 +466,14 @@ class ExtractFundingRateRealtime:
             
             # Determine which cycles to update based on current time
             # For 8h cycles: 0, 8, 16 - find the most recent one
-            recent_8h_hours = [0, 8, 16]
-            nearest_8h = max([h for h in recent_8h_hours if h <= current_hour], default=16)
+            nearest_8h = max(
+                (h for h in self.FUNDING_HOURS_8H if h <= current_hour), default=16
+            )
             
             # For 4h cycles: 0, 4, 8, 12, 16, 20 - find the most recent one
-            recent_4h_hours = [0, 4, 8, 12, 16, 20]
-            nearest_4h = max([h for h in recent_4h_hours if h <= current_hour], default=20)
+            nearest_4h = max(
+                (h for h in self.FUNDING_HOURS_4H if h <= current_hour), default=20
+            )
             
             self.logger.info(f"Current time: {current_hour}:00 UTC")
             self.logger.info(f"Nearest 8h cycle: {nearest_8h}:00 UTC")
@@ -377,14 +506,14 @@ class ExtractFundingRateRealtime:
                 "symbols_count": len(self.symbols),
                 "symbols_8h_count": len(self.symbols_8h),
                 "symbols_4h_count": len(self.symbols_4h),
-                "symbols": self.symbols[:10] if self.symbols else [],
+                "symbols": list(self.symbols[:10]),
                 "last_update_time": self.last_update_time.isoformat() if self.last_update_time else None,
                 "scheduler_thread_alive": (
                     self.scheduler_thread.is_alive()
                     if self.scheduler_thread
                     else False
                 ),
-                "next_scheduled_jobs": len(schedule.jobs),
+                "next_scheduled_jobs": len(self.scheduler.jobs),
             }
 
         except Exception as e:
@@ -1,10 +1,11 @@
+import hashlib
+import logging
 import threading
-import time
+from concurrent.futures import ThreadPoolExecutor
 import signal
 import sys
 from pathlib import Path
 from typing import List, Dict, Any, Optional
-from datetime import datetime
 
 # Add src to Python path
 sys.path.insert(0, str(Path(__file__).parent))
@@ -21,6 +22,31 @@ from src.utils.util_tele_bot_check import UtilTeleBotCheck
 class FundingRateManager:
     """Quản lý chính cho việc trích xuất và giám sát dữ liệu tỷ lệ funding"""
 
+    # Tập thuộc tính cố định cho đối tượng sống suốt tiến trình
+    __slots__ = (
+        "logger",
+        "extract_history",
+        "load_mongo",
+        "tele_bot",
+        "_io_pool",
+        "_last_message_hash",
+        "is_running",
+        "_stop_event",
+        "symbols",
+        "_realtime_symbols",
+        "history_thread",
+        "_history_stop",
+        "advanced_scheduler",
+        "_last_status_key",
+        "_cached_db_stats",
+        "_calls_since_stats",
+        "top_symbols_count",
+        "history_update_interval",
+        "monitoring_interval",
+        "enable_backup_incremental",
+        "max_realtime_symbols",
+    )
+
     def __init__(self):
         self.logger = ConfigLogging.config_logging("FundingRateManager")
 
@@ -29,16 +55,30 @@ class FundingRateManager:
         self.load_mongo = LoadMongo()
         self.tele_bot = UtilTeleBotCheck()
 
+        # Pool nhỏ, giới hạn số luồng cho các lời gọi I/O chặn (Telegram);
+        # tạo khi cần, đóng trong stop()
+        self._io_pool = None
+        self._last_message_hash = None  # Bỏ qua thông báo trùng lặp liên tiếp
+
         # State management
         self.is_running = False
+        self._stop_event = threading.Event()  # Đánh thức các vòng chờ ngay khi dừng
         self.symbols = []
+        self._realtime_symbols = ()  # Tính một lần trong initialize()
         self.history_thread = None
+        self._history_stop = None  # Event riêng của mỗi lần start(), vòng lặp cũ không bị hồi sinh
         self.advanced_scheduler = None  # New advanced scheduler
 
+        # Cache thống kê DB: chỉ truy vấn lại khi scheduler có thay đổi
+        self._last_status_key = None
+        self._cached_db_stats = {}
+        self._calls_since_stats = 0
+
         # Configuration from config_variable
         self.top_symbols_count = SYSTEM_CONFIG["top_symbols_count"]
         self.history_update_interval = SYSTEM_CONFIG["history_update_interval"]
         self.monitoring_interval = SYSTEM_CONFIG["monitoring_interval"]  # Now 1 hour
+        self.enable_backup_incremental = SYSTEM_CONFIG["enable_backup_incremental"]
 
         # Giới hạn symbols cho realtime để tránh tràn RAM
         self.max_realtime_symbols = min(100, self.top_symbols_count)
@@ -48,10 +88,30 @@ class FundingRateManager:
         signal.signal(signal.SIGTERM, self._signal_handler)
 
     def _signal_handler(self, signum, frame):
-        """Xử lý tín hiệu tắt"""
-        self.logger.info(f"Received signal {signum}, shutting down gracefully...")
-        self.stop()
-        sys.exit(0)
+        """Xử lý tín hiệu tắt
+
+        Chỉ đánh thức run_forever(); việc dừng và join threads chạy trong
+        luồng chính thay vì bên trong signal handler.
+        """
+        self.logger.info("Received signal %s, shutting down gracefully...", signum)
+        self._stop_event.set()
+
+    def _notify(self, message: str):
+        """Gửi thông báo Telegram trên pool I/O để không chặn luồng gọi
+
+        Tin nhắn giống hệt tin vừa gửi sẽ bị bỏ qua.
+
+        Args:
+            message: Nội dung tin nhắn
+        """
+        message_hash = hashlib.blake2b(message.encode(), digest_size=8).digest()
+        if message_hash == self._last_message_hash:
+            self.logger.debug("Skipping duplicate Telegram notification")
+            return
+        self._last_message_hash = message_hash
+        if self._io_pool is None:
+            self._io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="fr-io")
+        self._io_pool.submit(self.tele_bot.send_message, message)
 
     def initialize(self) -> bool:
         """Khởi tạo hệ thống
@@ -68,22 +128,32 @@ class FundingRateManager:
                 self.logger.error("Failed to get top symbols")
                 return False
 
-            self.logger.info(
-                f"Loaded {len(self.symbols)} symbols: {', '.join(self.symbols[:10])}..."
-            )
+            self._realtime_symbols = tuple(self.symbols[: self.max_realtime_symbols])
+
+            # Chỉ ghép chuỗi symbols khi INFO được bật
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info(
+                    "Loaded %d symbols: %s...",
+                    len(self.symbols),
+                    ", ".join(self.symbols[:10]),
+                )
 
             # Gửi thông báo khởi tạo
-            message = f"Funding Rate Manager Initialized\n"
-            message += f"Monitoring {len(self.symbols)} symbols\n"
-            message += f"History update interval: {self.history_update_interval}s\n"
-            message += f"Monitoring interval: {self.monitoring_interval}s (Advanced scheduler handles notifications)"
+            message = "\n".join(
+                (
+                    "Funding Rate Manager Initialized",
+                    f"Monitoring {len(self.symbols)} symbols",
+                    f"History update interval: {self.history_update_interval}s",
+                    f"Monitoring interval: {self.monitoring_interval}s (Advanced scheduler handles notifications)",
+                )
+            )
 
-            self.tele_bot.send_message(message)
+            self._notify(message)
 
             return True
 
         except Exception as e:
-            self.logger.error(f"Error during initialization: {e}")
+            self.logger.error("Error during initialization: %s", e)
             return False
 
     def _extract_initial_history(self):
@@ -97,29 +167,37 @@ class FundingRateManager:
             else:
                 self.logger.warning("Initial history extraction completed with some issues")
         except Exception as e:
-            self.logger.error(f"Error in initial history extraction: {e}")
+            self.logger.error("Error in initial history extraction: %s", e)
+
+    def _periodic_history_update(self, stop_event: threading.Event):
+        """Cập nhật lịch sử tỷ lệ funding theo chu kỳ
+
+        Args:
+            stop_event: Event của lần start() đã tạo vòng lặp này
+        """
+        # Gán sẵn các phương thức dùng trong vòng lặp vô hạn
+        extract_all_history = self.extract_history.extract_all_history
+        info = self.logger.info
+        wait_stop = stop_event.wait
 
-    def _periodic_history_update(self):
-        """Cập nhật lịch sử tỷ lệ funding theo chu kỳ"""
-        while self.is_running:
+        while not stop_event.is_set():
             try:
-                self.logger.info("Starting periodic history update")
+                info("Starting periodic history update")
                 # Extract recent history (last 2 days for incremental update)
-                success = self.extract_history.extract_all_history(self.symbols, days_back=2)
+                success = extract_all_history(self.symbols, days_back=2)
                 if success:
-                    self.logger.info("Periodic history update completed")
+                    info("Periodic history update completed")
                 else:
                     self.logger.warning("Periodic history update completed with issues")
 
-                # Wait for next update cycle
-                for _ in range(self.history_update_interval):
-                    if not self.is_running:
-                        break
-                    time.sleep(1)
+                # Wait for next update cycle (returns immediately on stop)
+                if wait_stop(timeout=self.history_update_interval):
+                    break
 
             except Exception as e:
-                self.logger.error(f"Error in periodic incremental update: {e}")
-                time.sleep(60)  # Wait 1 minute before retrying
+                self.logger.error("Error in periodic incremental update: %s", e)
+                if wait_stop(timeout=60):  # Wait 1 minute before retrying
+                    break
 
     def start(self) -> bool:
         """Khởi động hệ thống tỷ lệ funding
@@ -132,12 +210,19 @@ class FundingRateManager:
                 self.logger.warning("System is already running")
                 return True
 
+            # Không chạy hai vòng history song song (Mongo và rate limit Binance)
+            if self.history_thread and self.history_thread.is_alive():
+                self.logger.error("Previous history update loop is still running, not starting")
+                return False
+
             self.logger.info("Starting Funding Rate Manager")
             self.is_running = True
+            # Không clear _stop_event ở đây: tín hiệu tắt nhận được trước start() phải giữ nguyên
+            # (chỉ restart() clear sau khi stop())
 
             # Chọn symbols cho realtime (giới hạn để tránh quá tải)
-            symbols_for_realtime = self.symbols[:self.max_realtime_symbols]
-            self.logger.info(f"Selected {len(symbols_for_realtime)} symbols for realtime extraction")
+            symbols_for_realtime = self._realtime_symbols
+            self.logger.info("Selected %d symbols for realtime extraction", len(symbols_for_realtime))
 
             # Initialize and start advanced scheduler
             self.advanced_scheduler = AdvancedFundingRateScheduler(symbols_for_realtime)
@@ -149,17 +234,24 @@ class FundingRateManager:
             # Khởi động trích xuất lịch sử ban đầu trong background
             threading.Thread(target=self._extract_initial_history, daemon=True).start()
 
-            # Khởi động cập nhật lịch sử định kỳ
-            self.history_thread = threading.Thread(
-                target=self._periodic_history_update, daemon=True
-            )
-            self.history_thread.start()
+            # Cập nhật lịch sử định kỳ: không có job history nào khác, nên mặc định bật;
+            # tắt bằng ENABLE_BACKUP_INCREMENTAL=false khi có nguồn cập nhật history khác
+            # Daemon thread: một lần extraction đang chạy dở không giữ process lại khi thoát
+            if self.enable_backup_incremental:
+                self._history_stop = threading.Event()
+                self.history_thread = threading.Thread(
+                    target=self._periodic_history_update,
+                    args=(self._history_stop,),
+                    name="fr-history",
+                    daemon=True,
+                )
+                self.history_thread.start()
 
             # Advanced scheduler handles all monitoring and notifications
             # No need for separate system monitoring thread
 
             self.logger.info("Funding Rate Manager with Advanced Scheduler started successfully")
-            self.tele_bot.send_message(
+            self._notify(
                 "🚀 Funding Rate Manager with Advanced Scheduler started!\n"
                 f"📊 Multi-interval monitoring: {len(symbols_for_realtime)} symbols\n"
                 f"⚡ 1h monitoring: Real-time data updates\n"
@@ -172,7 +264,7 @@ class FundingRateManager:
             return True
 
         except Exception as e:
-            self.logger.error(f"Error starting system: {e}")
+            self.logger.error("Error starting system: %s", e)
             self.is_running = False
             return False
 
@@ -180,7 +272,8 @@ class FundingRateManager:
         """Dừng hệ thống tỷ lệ funding
 
         Returns:
-            True nếu dừng thành công, False nếu không
+            True nếu dừng thành công, False nếu lỗi hoặc vòng lặp history
+            chưa kết thúc sau 10s (xem history_thread)
         """
         try:
             if not self.is_running:
@@ -189,21 +282,36 @@ class FundingRateManager:
 
             self.logger.info("Stopping Funding Rate Manager")
             self.is_running = False
+            self._stop_event.set()
 
             # Stop advanced scheduler
             if self.advanced_scheduler:
                 self.advanced_scheduler.stop_scheduler()
 
-            # Chờ threads kết thúc
-            if self.history_thread and self.history_thread.is_alive():
+            # Chờ vòng lặp history kết thúc (đang extraction dở thì dừng sau lần extraction đó)
+            history_stopped = True
+            if self._history_stop:
+                self._history_stop.set()
+            if self.history_thread:
                 self.history_thread.join(timeout=10)
+                if self.history_thread.is_alive():
+                    self.logger.warning("History update loop did not stop within 10s")
+                    history_stopped = False
 
-            self.logger.info("Funding Rate Manager stopped successfully")
-            self.tele_bot.send_message("Funding Rate Manager stopped")
-            return True
+            if history_stopped:
+                self.logger.info("Funding Rate Manager stopped successfully")
+            else:
+                self.logger.info("Funding Rate Manager stopped, history update still finishing")
+            self._notify("Funding Rate Manager stopped")
+
+            # Gửi nốt các thông báo đang chờ rồi đóng pool (_notify tạo lại khi cần)
+            io_pool, self._io_pool = self._io_pool, None
+            if io_pool:
+                io_pool.shutdown(wait=True)
+            return history_stopped
 
         except Exception as e:
-            self.logger.error(f"Error stopping system: {e}")
+            self.logger.error("Error stopping system: %s", e)
             return False
 
     def restart(self) -> bool:
@@ -214,11 +322,15 @@ class FundingRateManager:
         """
         self.logger.info("Restarting Funding Rate Manager")
 
+        # stop() join scheduler thread và vòng lặp history (tối đa 10s);
+        # nếu history đang extraction dở thì chờ nó xong thay vì chạy hai vòng song song
         if not self.stop():
-            return False
-
-        time.sleep(5)  # Wait a bit before restarting
+            if not (self.history_thread and self.history_thread.is_alive()):
+                return False
+            self.logger.info("Waiting for the running history update to finish before restarting")
+            self.history_thread.join()
 
+        self._stop_event.clear()
         return self.start()
 
     def get_status(self) -> Dict[str, Any]:
@@ -228,13 +340,27 @@ class FundingRateManager:
             Từ điển trạng thái
         """
         try:
-            stats = self.load_mongo.get_funding_rate_stats()
-            
             # Get advanced scheduler status
             scheduler_status = {}
             if self.advanced_scheduler:
                 scheduler_status = self.advanced_scheduler.get_status()
 
+            # Dữ liệu chỉ thay đổi sau mỗi lần scheduler chạy job, nên bỏ qua
+            # truy vấn thống kê nặng khi không có gì mới (làm mới sau 10 lần)
+            status_key = (
+                self.is_running,
+                scheduler_status.get("last_1h_execution"),
+                scheduler_status.get("last_4h_execution"),
+                scheduler_status.get("last_8h_execution"),
+            )
+            if status_key != self._last_status_key or self._calls_since_stats >= 10:
+                self._cached_db_stats = self.load_mongo.get_funding_rate_stats()
+                self._last_status_key = status_key
+                self._calls_since_stats = 0
+            else:
+                self._calls_since_stats += 1
+            stats = self._cached_db_stats
+
             return {
                 "is_running": self.is_running,
                 "symbols_count": len(self.symbols),
@@ -243,13 +369,15 @@ class FundingRateManager:
                 "database_stats": stats,
                 "threads_alive": {
                     "history_thread": (
-                        self.history_thread.is_alive() if self.history_thread else False
+                        self.history_thread.is_alive()
+                        if self.history_thread
+                        else False
                     ),
                 },
             }
 
         except Exception as e:
-            self.logger.error(f"Error getting status: {e}")
+            self.logger.error("Error getting status: %s", e)
             return {"error": str(e)}
 
     def run_forever(self):
@@ -258,14 +386,18 @@ class FundingRateManager:
             self.logger.error("Failed to initialize system")
             return
 
+        # Tín hiệu tắt đến trong lúc initialize() (get_top_symbols chậm): không khởi động nữa
+        if self._stop_event.is_set():
+            self.logger.info("Shutdown requested during initialization, not starting")
+            return
+
         if not self.start():
             self.logger.error("Failed to start system")
             return
 
         try:
-            # Advanced scheduler handles everything, just keep main thread alive
-            while self.is_running:
-                time.sleep(60)  # Check every minute
+            # Advanced scheduler handles everything, main thread just waits for stop
+            self._stop_event.wait()
         except KeyboardInterrupt:
             self.logger.info("Received keyboard interrupt")
         finally:
@@ -1,16 +1,63 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional
+import bson
 from pymongo.collection import Collection
-from pymongo.errors import DuplicateKeyError, BulkWriteError
+from pymongo.errors import BulkWriteError, OperationFailure
 from pymongo import UpdateOne, InsertOne
-import pandas as pd
+from pymongo.write_concern import WriteConcern
 from src.config.config_mongo import ConfigMongo
 from src.config.config_logging import ConfigLogging
 import datetime
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import chain, islice
 
 
 class LoadMongo:
     """Tải dữ liệu lên MongoDB"""
 
+    # Index specs (keys, options) cho từng loại collection
+    _FUNDING_REALTIME_INDEXES = (
+        # symbol/eventTime luôn có trong bản ghi nên không cần sparse
+        ([("symbol", 1), ("eventTime", 1)], {"unique": True, "background": True}),
+    )
+    _HISTORY_INDEXES = (
+        # Index chính cho history collection - compound index hiệu quả
+        (
+            [("symbol", 1), ("funding_date", 1), ("funding_time", 1)],
+            {"unique": True, "background": True},
+        ),
+        # Đọc thời gian funding mới nhất theo epoch ms không cần parse chuỗi
+        ([("symbol", 1), ("funding_time_ms", -1)], {"background": True}),
+        # Không có index đơn trường: mọi truy vấn history đều lọc theo symbol,
+        # đã là prefix của hai compound index ở trên
+        # Index TTL để tự động xóa dữ liệu cũ (tùy chọn)
+        # ("funding_date", {"expireAfterSeconds": 365*24*60*60, "background": True}),  # 1 năm
+    )
+    _REALTIME_EVENT_INDEXES = (
+        # Truy vấn theo khoảng thời gian dùng event_time (epoch ms) trên index này
+        ([("symbol", 1), ("event_time", 1)], {"unique": True, "background": True}),
+    )
+    _REALTIME_LATEST_INDEXES = (
+        ("symbol", {"unique": True, "background": True}),
+        # Cho verify_recent_funding_data: $match + $group chỉ đọc từ index (covered)
+        ([("last_update_time", -1), ("symbol", 1)], {"background": True}),
+    )
+
+    # Trường khóa (filter của upsert) cho từng loại collection
+    _HISTORY_KEY_FIELDS = ("symbol", "funding_date", "funding_time")
+    _REALTIME_EVENT_KEY_FIELDS = ("symbol", "event_time")
+    _REALTIME_LATEST_KEY_FIELDS = ("symbol",)
+
+    # Write concern không chờ ack cho dữ liệu realtime (idempotent, bị ghi đè ở tick sau)
+    _UNACKNOWLEDGED = WriteConcern(w=0)
+
+    # Dùng chung giữa mọi instance: mỗi tiến trình chỉ tạo index một lần
+    _ensured_indexes = set()
+    _ensured_indexes_lock = threading.Lock()
+
     def __init__(self, database_name: str = "funding_rate_db"):
         self.logger = ConfigLogging.config_logging("LoadMongo")
         self.config_mongo = ConfigMongo()
@@ -18,6 +65,22 @@ class LoadMongo:
         self.database = self.client[database_name]
         self.logger.info(f"Connected to MongoDB database: {database_name}")
 
+        # Cache đối tượng Collection thay vì tạo mới mỗi lần truy cập
+        self._collection_cache: Dict[str, Collection] = {}
+        self.history = self.get_collection("history")
+
+        # Hàng đợi ghi realtime, writer thread chỉ khởi động khi có dữ liệu đầu tiên
+        self._realtime_queue = queue.Queue()
+        self._realtime_writer = None
+        self._realtime_writer_lock = threading.Lock()
+        self.realtime_flush_interval = 0.2  # giây
+        self.realtime_flush_size = 500
+
+        # Thống kê ghi realtime gộp lại, log INFO theo chu kỳ thay vì mỗi batch
+        self._realtime_stats = {"upserted": 0, "duplicates": 0, "sent": 0, "since": time.monotonic()}
+        self._realtime_stats_lock = threading.Lock()
+        self.realtime_stats_interval = 30  # giây
+
     def get_collection(self, collection_name: str) -> Collection:
         """Lấy collection MongoDB
 
@@ -27,12 +90,212 @@ class LoadMongo:
         Returns:
             Đối tượng collection MongoDB
         """
-        return self.database[collection_name]
+        collection = self._collection_cache.get(collection_name)
+        if collection is None:
+            collection = self.database[collection_name]
+            self._collection_cache[collection_name] = collection
+        return collection
+
+    @staticmethod
+    def _upsert_operation(item: Dict[str, Any], key_fields: tuple) -> UpdateOne:
+        """Tạo UpdateOne upsert với $set chỉ chứa các trường không phải khóa
+
+        Khi upsert tạo document mới, MongoDB tự chép các trường equality của
+        filter vào document, nên không cần đưa lại chúng vào $set.
+
+        Args:
+            item: Bản ghi cần ghi
+            key_fields: Các trường dùng làm filter
+
+        Returns:
+            Đối tượng UpdateOne
+        """
+        filter_doc = {field: item[field] for field in key_fields}
+        set_doc = {key: value for key, value in item.items() if key not in key_fields}
+        update = {"$set": set_doc} if set_doc else {"$setOnInsert": filter_doc}
+        return UpdateOne(filter_doc, update, upsert=True)
+
+    @staticmethod
+    def _bulk_batch_size(sample: Dict[str, Any]) -> int:
+        """Tính số operation cho mỗi lần bulk_write theo kích thước bản ghi
+
+        Nhắm khoảng 12MB mỗi lệnh, dưới giới hạn 16MB / 100k operation của MongoDB.
+
+        Args:
+            sample: Một bản ghi đại diện của batch
+
+        Returns:
+            Số operation mỗi batch
+        """
+        approx_bytes = len(bson.encode(sample))
+        return min(100000, max(1, 12_000_000 // approx_bytes))
+
+    def _bulk_write_batches(
+        self, collection: Collection, operations: Iterable[Any], batch_size: int
+    ) -> tuple:
+        """Ghi operations theo batch, các batch chạy song song trên connection pool
+
+        Operations được lấy dần từ iterator nên chỉ tối đa vài batch nằm trong
+        bộ nhớ cùng lúc.
+
+        Args:
+            collection: Collection MongoDB
+            operations: Iterable các UpdateOne/InsertOne (có thể là generator)
+            batch_size: Số operation mỗi batch
+
+        Returns:
+            (tổng upserted, tổng modified)
+        """
+        max_workers = 8
+        operations = iter(operations)
+        first_batch = list(islice(operations, batch_size))
+        second_batch = list(islice(operations, batch_size))
+
+        if not second_batch:
+            if not first_batch:
+                return 0, 0
+            result = collection.bulk_write(first_batch, ordered=False)
+            return self._result_counts(result)
+
+        batches = chain(
+            (first_batch, second_batch),
+            iter(lambda: list(islice(operations, batch_size)), []),
+        )
+        total_upserted = 0
+        total_modified = 0
+
+        # Các batch độc lập (ordered=False) nên có thể ghi đồng thời,
+        # giới hạn số batch đang chạy để không đọc trước toàn bộ iterator
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            in_flight = set()
+            for batch in batches:
+                if len(in_flight) >= max_workers:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        upserted, modified = self._result_counts(future.result())
+                        total_upserted += upserted
+                        total_modified += modified
+                in_flight.add(pool.submit(collection.bulk_write, batch, ordered=False))
+
+            for future in in_flight:
+                upserted, modified = self._result_counts(future.result())
+                total_upserted += upserted
+                total_modified += modified
+
+        return total_upserted, total_modified
+
+    @staticmethod
+    def _result_counts(result) -> tuple:
+        """Lấy (upserted, modified) từ BulkWriteResult, (0, 0) nếu ghi với w=0
+
+        Args:
+            result: BulkWriteResult
+
+        Returns:
+            (upserted, modified)
+        """
+        if not result.acknowledged:
+            return 0, 0
+        return result.upserted_count, result.modified_count
+
+    @staticmethod
+    def _stringify_datetimes(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Chuyển các giá trị date/time/datetime trong bản ghi thành chuỗi (in-place)
+
+        Sửa trực tiếp trên bản ghi của caller thay vì tạo bản sao, nên chỉ giữ
+        một bản dữ liệu trong bộ nhớ.
+
+        Args:
+            data: Danh sách bản ghi
+
+        Returns:
+            Chính danh sách data sau khi chuyển đổi
+        """
+        datetime_types = (datetime.datetime, datetime.date, datetime.time)
+        for item in data:
+            for key, value in item.items():
+                if isinstance(value, datetime_types):
+                    item[key] = str(value)
+        return data
+
+    def _ensure_indexes(self, collection: Collection, specs) -> None:
+        """Tạo indexes cho collection một lần duy nhất trong tiến trình
+
+        Args:
+            collection: Collection MongoDB
+            specs: Danh sách (keys, options) truyền cho create_index
+        """
+        cache_key = (collection.name,) + tuple(str(keys) for keys, _ in specs)
+        if cache_key in self._ensured_indexes:
+            return
+
+        # Các worker ghi song song chỉ để một luồng gửi createIndexes
+        with self._ensured_indexes_lock:
+            if cache_key in self._ensured_indexes:
+                return
+
+            try:
+                for keys, options in specs:
+                    try:
+                        collection.create_index(keys, **options)
+                    except OperationFailure as conflict:
+                        # Index đã tồn tại với options cũ (ví dụ sparse): giữ nguyên,
+                        # không tạo lại mỗi lần ghi
+                        if conflict.code not in (85, 86):
+                            raise
+                        self.logger.warning(
+                            f"Index {keys} on {collection.name} exists with different options: {conflict}"
+                        )
+                self._ensured_indexes.add(cache_key)
+            except Exception as idx_error:
+                self.logger.warning(f"Index creation warning: {idx_error}")
+
+    @staticmethod
+    def _to_history_record(symbol: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Chuyển bản ghi funding thô từ Binance sang schema của collection history
+
+        Args:
+            symbol: Symbol giao dịch
+            item: Bản ghi thô với fundingTime (ms), fundingRate, markPrice
+
+        Returns:
+            Bản ghi với funding_date/funding_time dạng chuỗi ISO
+        """
+        funding_datetime = datetime.datetime.fromtimestamp(
+            item["fundingTime"] / 1000, tz=datetime.timezone.utc
+        )
+        return {
+            "symbol": symbol,
+            "funding_date": funding_datetime.date().isoformat(),
+            "funding_time": funding_datetime.time().replace(microsecond=0).isoformat(),
+            "fundingRate": float(item.get("fundingRate", 0)),
+            "markPrice": float(item.get("markPrice", 0)),
+            "funding_time_ms": int(item["fundingTime"]),
+        }
+
+    @staticmethod
+    def _funding_time_ms(funding_date: str, funding_time: str) -> int:
+        """Chuyển funding_date/funding_time (UTC) thành timestamp milliseconds
+
+        Args:
+            funding_date: Ngày dạng YYYY-MM-DD
+            funding_time: Giờ dạng HH:MM:SS
+
+        Returns:
+            Timestamp tính bằng milliseconds
+        """
+        funding_datetime = datetime.datetime.fromisoformat(
+            f"{funding_date} {funding_time}"
+        ).replace(tzinfo=datetime.timezone.utc)
+        return int(funding_datetime.timestamp() * 1000)
 
     def insert_funding_rate_history(
         self, symbol: str, data: List[Dict[str, Any]]
     ) -> bool:
-        """Chèn dữ liệu lịch sử tỷ lệ funding
+        """Chèn dữ liệu lịch sử tỷ lệ funding vào collection history chung
+
+        Dữ liệu thô được chuyển sang cùng schema với save_transformed_funding_data
+        (symbol, funding_date, funding_time) để dùng chung unique index.
 
         Args:
             symbol: Symbol giao dịch (ví dụ: BTCUSDT)
@@ -42,35 +305,34 @@ class LoadMongo:
             True nếu thành công, False nếu không
         """
         try:
-            collection_name = f"funding_rate_history_{symbol.lower()}"
-            collection = self.get_collection(collection_name)
-
-            # Tạo index để truy vấn nhanh hơn - optimized
-            try:
-                collection.create_index(
-                    "fundingTime", unique=True, background=True, sparse=True
-                )
-            except Exception as idx_error:
-                self.logger.warning(f"Index creation warning: {idx_error}")
+            collection = self.history
+            self._ensure_indexes(collection, self._HISTORY_INDEXES)
 
             if data:
-                # Sử dụng upsert để tránh trùng lặp
-                operations = []
-                for item in data:
-                    operations.append(
-                        {
-                            "updateOne": {
-                                "filter": {"fundingTime": item["fundingTime"]},
-                                "update": {"$set": item},
-                                "upsert": True,
-                            }
-                        }
+                records = [self._to_history_record(symbol, item) for item in data]
+
+                # Lịch sử funding chỉ ghi một lần: bản ghi sau thời gian funding
+                # mới nhất chắc chắn chưa có nên insert thẳng, không cần upsert
+                latest_time = self.get_latest_funding_time(symbol)
+                new_records = [r for r in records if r["funding_time_ms"] > latest_time]
+                existing_records = [
+                    r for r in records if r["funding_time_ms"] <= latest_time
+                ]
+                if new_records:
+                    existing_records.extend(
+                        self._insert_new_records(collection, new_records)
                     )
 
-                result = collection.bulk_write(operations, ordered=False)
-                self.logger.info(
-                    f"Inserted {result.upserted_count} new records for {symbol}"
-                )
+                # Sử dụng upsert để tránh trùng lặp
+                if existing_records:
+                    operations = [
+                        self._upsert_operation(record, self._HISTORY_KEY_FIELDS)
+                        for record in existing_records
+                    ]
+                    result = collection.bulk_write(operations, ordered=False)
+                    self.logger.info(
+                        f"Upserted {result.upserted_count} new records for {symbol}"
+                    )
                 return True
 
         except BulkWriteError as e:
@@ -81,52 +343,67 @@ class LoadMongo:
             return False
 
     def insert_funding_rate_realtime(self, data: Dict[str, Any]) -> bool:
-        """Chèn dữ liệu tỷ lệ funding theo thời gian thực
+        """Đưa dữ liệu tỷ lệ funding theo thời gian thực vào hàng đợi ghi
+
+        Writer thread gom dữ liệu và ghi bằng insert_funding_rate_realtime_batch,
+        nên luồng gọi không phải chờ round-trip MongoDB cho từng tick.
 
         Args:
             data: Dữ liệu tỷ lệ funding
 
         Returns:
-            True nếu thành công, False nếu không
+            True nếu đã đưa vào hàng đợi, False nếu không
         """
         try:
-            collection = self.get_collection("funding_rate_realtime")
-
-            # Tạo compound index - optimized
-            try:
-                collection.create_index(
-                    [("symbol", 1), ("eventTime", 1)],
-                    unique=True,
-                    background=True,
-                    sparse=True,
-                )
-            except Exception as idx_error:
-                self.logger.warning(f"Index creation warning: {idx_error}")
-
-            # Upsert để tránh trùng lặp
-            result = collection.update_one(
-                {"symbol": data["symbol"], "eventTime": data["eventTime"]},
-                {"$set": data},
-                upsert=True,
-            )
-
-            if result.upserted_id:
-                self.logger.debug(f"Inserted new realtime data for {data['symbol']}")
-
+            self._start_realtime_writer()
+            self._realtime_queue.put(data)
             return True
 
-        except DuplicateKeyError:
-            self.logger.debug(f"Duplicate realtime data for {data['symbol']}")
-            return True
         except Exception as e:
-            self.logger.error(f"Error inserting realtime funding rate: {e}")
+            self.logger.error(f"Error queueing realtime funding rate: {e}")
             return False
 
-    def insert_funding_rate_realtime_batch(self, data: List[Dict[str, Any]]) -> bool:
+    def _start_realtime_writer(self):
+        """Khởi động writer thread cho dữ liệu realtime nếu chưa chạy"""
+        if self._realtime_writer and self._realtime_writer.is_alive():
+            return
+
+        with self._realtime_writer_lock:
+            if self._realtime_writer and self._realtime_writer.is_alive():
+                return
+            self._realtime_writer = threading.Thread(
+                target=self._realtime_writer_loop,
+                name="realtime-writer",
+                daemon=True,
+            )
+            self._realtime_writer.start()
+
+    def _realtime_writer_loop(self):
+        """Gom dữ liệu realtime theo thời gian/số lượng rồi ghi một lần"""
+        while True:
+            batch = [self._realtime_queue.get()]
+            deadline = time.monotonic() + self.realtime_flush_interval
+
+            while len(batch) < self.realtime_flush_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._realtime_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # Upsert theo (symbol, eventTime) nên ghi lại vẫn idempotent
+            self.insert_funding_rate_realtime_batch(batch)
+
+    def insert_funding_rate_realtime_batch(
+        self, data: List[Dict[str, Any]], fast_insert: bool = True
+    ) -> bool:
         """Chèn dữ liệu tỷ lệ funding theo thời gian thực theo batch
 
         Args:
             data: Danh sách dữ liệu tỷ lệ funding
+            fast_insert: Ghi với w=0 (không chờ server xác nhận)
 
         Returns:
             True nếu thành công, False nếu không
@@ -137,38 +414,45 @@ class LoadMongo:
 
             collection = self.get_collection("funding_rate_realtime")
 
-            # Tạo compound index - optimized cho batch
-            try:
-                collection.create_index(
-                    [("symbol", 1), ("eventTime", 1)],
-                    unique=True,
-                    background=True,
-                    sparse=True,
-                )
-            except Exception as idx_error:
-                self.logger.warning(f"Index creation warning: {idx_error}")
+            self._ensure_indexes(collection, self._FUNDING_REALTIME_INDEXES)
 
-            # Chuẩn bị bulk operations
-            operations = []
+            # Mỗi sự kiện (symbol, eventTime) chỉ phát một lần với nội dung cố định,
+            # nên $setOnInsert: bản ghi trùng chỉ match, không ghi lại document.
+            # Trường khóa đã có trong filter (upsert tự chép sang document mới),
+            # nên bỏ khỏi $setOnInsert để không encode BSON hai lần mỗi tick
+            # Gộp tick trùng (symbol, eventTime) trong cùng batch trước khi gửi;
+            # giữ bản đầu tiên giống kết quả $setOnInsert khi gửi lần lượt
+            unique_items = {}
             for item in data:
-                operations.append(
-                    {
-                        "updateOne": {
-                            "filter": {
-                                "symbol": item["symbol"],
-                                "eventTime": item["eventTime"],
-                            },
-                            "update": {"$set": item},
-                            "upsert": True,
-                        }
-                    }
+                unique_items.setdefault((item["symbol"], item["eventTime"]), item)
+            batch_duplicates = len(data) - len(unique_items)
+
+            operations = []
+            append = operations.append
+            for item in unique_items.values():
+                filter_doc = {"symbol": item["symbol"], "eventTime": item["eventTime"]}
+                insert_doc = {
+                    key: value
+                    for key, value in item.items()
+                    if key != "symbol" and key != "eventTime"
+                }
+                append(
+                    UpdateOne(
+                        filter_doc, {"$setOnInsert": insert_doc or filter_doc}, upsert=True
+                    )
                 )
 
             if operations:
+                if fast_insert:
+                    collection = collection.with_options(write_concern=self._UNACKNOWLEDGED)
                 result = collection.bulk_write(operations, ordered=False)
-                self.logger.info(
-                    f"Batch inserted {result.upserted_count} new realtime records (updated {result.modified_count})"
-                )
+                if result.acknowledged:
+                    self._record_realtime_stats(
+                        result.upserted_count, result.matched_count + batch_duplicates
+                    )
+                else:
+                    # w=0: server không trả số bản ghi mới, chỉ đếm số thao tác đã gửi
+                    self._record_realtime_stats(0, batch_duplicates, sent=len(operations))
 
             return True
 
@@ -176,6 +460,37 @@ class LoadMongo:
             self.logger.error(f"Error batch inserting realtime funding rate: {e}")
             return False
 
+    def _record_realtime_stats(self, upserted: int, duplicates: int, sent: int = 0):
+        """Cộng dồn kết quả ghi realtime và log tổng hợp mỗi realtime_stats_interval giây
+
+        Args:
+            upserted: Số bản ghi mới
+            duplicates: Số bản ghi trùng
+            sent: Số thao tác gửi với w=0 (không biết kết quả)
+        """
+        with self._realtime_stats_lock:
+            stats = self._realtime_stats
+            stats["upserted"] += upserted
+            stats["duplicates"] += duplicates
+            stats["sent"] += sent
+
+            elapsed = time.monotonic() - stats["since"]
+            if elapsed < self.realtime_stats_interval:
+                return
+
+            upserted_total = stats["upserted"]
+            duplicates_total = stats["duplicates"]
+            sent_total = stats["sent"]
+            self._realtime_stats = {"upserted": 0, "duplicates": 0, "sent": 0, "since": time.monotonic()}
+
+        self.logger.info(
+            "Realtime writes in last %.0fs: %d new records (duplicates %d, unacknowledged upserts sent %d)",
+            elapsed,
+            upserted_total,
+            duplicates_total,
+            sent_total,
+        )
+
     def get_latest_funding_time(self, symbol: str) -> int:
         """Lấy thời gian funding mới nhất cho một symbol
 
@@ -186,31 +501,82 @@ class LoadMongo:
             Timestamp thời gian funding mới nhất hoặc 0 nếu không có dữ liệu
         """
         try:
-            # Check in the unified history collection first
-            collection = self.get_collection("history")
+            collection = self.history
+            # hint lỗi nếu index chưa tồn tại (DB mới), nên đảm bảo index trước
+            self._ensure_indexes(collection, self._HISTORY_INDEXES)
+
+            # Bản ghi mới lưu sẵn funding_time_ms nên đọc thẳng từ index
             latest = collection.find_one(
-                {"symbol": symbol}, 
-                sort=[("funding_date", -1), ("funding_time", -1)]
+                {"symbol": symbol},
+                projection={"funding_time_ms": 1, "_id": 0},
+                sort=[("funding_time_ms", -1)],
+                hint=[("symbol", 1), ("funding_time_ms", -1)],
+            )
+            if latest and "funding_time_ms" in latest:
+                return latest["funding_time_ms"]
+
+            # Bản ghi cũ chưa có funding_time_ms: equality trên symbol + sort trên
+            # date/time khớp unique index (duyệt ngược), covered query
+            latest = collection.find_one(
+                {"symbol": symbol},
+                projection={"funding_date": 1, "funding_time": 1, "_id": 0},
+                sort=[("funding_date", -1), ("funding_time", -1)],
+                hint=[("symbol", 1), ("funding_date", 1), ("funding_time", 1)],
             )
             
             if latest:
-                # Convert funding_date and funding_time back to timestamp
-                from datetime import datetime
-                date_str = latest["funding_date"]
-                time_str = latest["funding_time"]
-                dt = datetime.fromisoformat(f"{date_str} {time_str}")
-                return int(dt.timestamp() * 1000)
-            
-            # Fallback to old format (individual collections)
-            collection_name = f"funding_rate_history_{symbol.lower()}"
-            collection = self.get_collection(collection_name)
-            latest = collection.find_one({}, sort=[("fundingTime", -1)])
-            return latest["fundingTime"] if latest else 0
+                return self._funding_time_ms(
+                    latest["funding_date"], latest["funding_time"]
+                )
+
+            return 0
 
         except Exception as e:
             self.logger.error(f"Error getting latest funding time for {symbol}: {e}")
             return 0
 
+    def get_latest_funding_times(
+        self, symbols: List[str]
+    ) -> Optional[Dict[str, int]]:
+        """Lấy thời gian funding mới nhất cho nhiều symbol trong một round-trip
+
+        Args:
+            symbols: Danh sách symbol giao dịch
+
+        Returns:
+            Từ điển symbol -> timestamp mới nhất (ms); symbol chưa có dữ liệu bị bỏ qua.
+            None nếu truy vấn lỗi
+        """
+        try:
+            if not symbols:
+                return {}
+
+            collection = self.history
+            self._ensure_indexes(collection, self._HISTORY_INDEXES)
+
+            # $sort + $group/$first theo đúng thứ tự index cho phép DISTINCT_SCAN
+            pipeline = [
+                {"$match": {"symbol": {"$in": list(symbols)}}},
+                {"$sort": {"symbol": 1, "funding_time_ms": -1}},
+                {"$group": {"_id": "$symbol", "t": {"$first": "$funding_time_ms"}}},
+            ]
+            results = collection.aggregate(
+                pipeline, hint=[("symbol", 1), ("funding_time_ms", -1)]
+            )
+
+            latest_times = {}
+            for item in results:
+                if item["t"] is not None:
+                    latest_times[item["_id"]] = item["t"]
+                else:
+                    # Bản ghi cũ chưa có funding_time_ms
+                    latest_times[item["_id"]] = self.get_latest_funding_time(item["_id"])
+            return latest_times
+
+        except Exception as e:
+            self.logger.error(f"Error getting latest funding times: {e}")
+            return None
+
     def has_funding_data(self, symbol: str) -> bool:
         """Kiểm tra xem symbol có dữ liệu funding nào không
 
@@ -221,17 +587,12 @@ class LoadMongo:
             True nếu có dữ liệu, False nếu không
         """
         try:
-            # Check in the unified history collection first
-            collection = self.get_collection("history")
-            count = collection.count_documents({"symbol": symbol}, limit=1)
-            if count > 0:
-                return True
-            
-            # Fallback to old format (individual collections)
-            collection_name = f"funding_rate_history_{symbol.lower()}"
-            collection = self.get_collection(collection_name)
-            count = collection.count_documents({}, limit=1)
-            return count > 0
+            collection = self.history
+            # Dừng ngay ở entry đầu tiên của index symbol, không cần đếm
+            return (
+                collection.find_one({"symbol": symbol}, projection={"_id": 1})
+                is not None
+            )
 
         except Exception as e:
             self.logger.error(f"Error checking funding data for {symbol}: {e}")
@@ -246,25 +607,25 @@ class LoadMongo:
         try:
             stats = {}
 
-            # Lấy tên collection cho lịch sử
-            collection_names = self.database.list_collection_names()
-            history_collections = [
-                name
-                for name in collection_names
-                if name.startswith("funding_rate_history_")
-            ]
-
-            stats["total_symbols"] = len(history_collections)
-            stats["collections"] = {}
-
-            for collection_name in history_collections:
-                collection = self.get_collection(collection_name)
-                count = collection.count_documents({})
-                stats["collections"][collection_name] = count
+            # Đếm bản ghi lịch sử theo symbol bằng một aggregation duy nhất;
+            # chỉ project symbol để đọc thẳng từ index, không chạm document
+            history_collection = self.history
+            self._ensure_indexes(history_collection, self._HISTORY_INDEXES)
+            symbol_counts = history_collection.aggregate(
+                [
+                    {"$project": {"_id": 0, "symbol": 1}},
+                    {"$group": {"_id": "$symbol", "n": {"$sum": 1}}},
+                ],
+                hint=[("symbol", 1), ("funding_time_ms", -1)],
+            )
+            stats["symbols"] = {item["_id"]: item["n"] for item in symbol_counts}
+            stats["total_symbols"] = len(stats["symbols"])
+            stats["history_count"] = history_collection.estimated_document_count()
 
             # Thống kê collection realtime
             realtime_collection = self.get_collection("funding_rate_realtime")
-            stats["realtime_count"] = realtime_collection.count_documents({})
+            # Đọc từ metadata collection thay vì quét toàn bộ
+            stats["realtime_count"] = realtime_collection.estimated_document_count()
 
             return stats
 
@@ -272,11 +633,95 @@ class LoadMongo:
             self.logger.error(f"Error getting funding rate stats: {e}")
             return {}
 
-    def save_transformed_funding_data(self, data: List[Dict[str, Any]]) -> bool:
-        """Lưu dữ liệu tỷ lệ funding đã biến đổi vào MongoDB sử dụng pandas để xử lý hiệu quả
+    def _insert_new_records(
+        self,
+        collection: Collection,
+        records: List[Dict[str, Any]],
+        batch_size: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Chèn bản ghi bằng insert_many(ordered=False), không cần tra filter như upsert
+
+        Dữ liệu lớn (backfill toàn bộ lịch sử) được chia batch và ghi song song.
+
+        Args:
+            collection: Collection MongoDB
+            records: Danh sách bản ghi cần chèn
+            batch_size: Số bản ghi mỗi batch (mặc định tính theo kích thước bản ghi)
+
+        Returns:
+            Các bản ghi bị trùng unique key (cần upsert lại)
+        """
+        if not records:
+            return []
+
+        if batch_size is None:
+            batch_size = self._bulk_batch_size(records[0])
+        batches = [
+            records[i : i + batch_size] for i in range(0, len(records), batch_size)
+        ]
+
+        if len(batches) == 1:
+            results = [self._insert_batch(collection, batches[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(8, len(batches))) as pool:
+                results = list(
+                    pool.map(lambda batch: self._insert_batch(collection, batch), batches)
+                )
+
+        inserted = sum(count for count, _ in results)
+        duplicates = [record for _, batch_duplicates in results for record in batch_duplicates]
+        self.logger.info(
+            f"Inserted {inserted} new records to {collection.name} collection "
+            f"({len(duplicates)} duplicates)"
+        )
+        return duplicates
+
+    @staticmethod
+    def _insert_batch(collection: Collection, batch: List[Dict[str, Any]]) -> tuple:
+        """Chèn một batch, bỏ qua lỗi trùng key
+
+        Args:
+            collection: Collection MongoDB
+            batch: Danh sách bản ghi
+
+        Returns:
+            (số bản ghi đã chèn, các bản ghi bị trùng key)
+        """
+        try:
+            result = collection.insert_many(batch, ordered=False)
+            return len(result.inserted_ids), []
+
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            # Chỉ bỏ qua lỗi trùng key (11000), lỗi khác vẫn báo lên
+            if any(error.get("code") != 11000 for error in write_errors):
+                raise
+
+            # insert_many đã gán _id vào bản ghi, bỏ đi để $set không đụng _id
+            duplicates = [
+                {key: value for key, value in batch[error["index"]].items() if key != "_id"}
+                for error in write_errors
+            ]
+            return e.details.get("nInserted", 0), duplicates
+
+    def save_transformed_funding_data(
+        self,
+        data: List[Dict[str, Any]],
+        batch_size: Optional[int] = None,
+        known_new: bool = False,
+        preformatted: bool = False,
+    ) -> bool:
+        """Lưu dữ liệu tỷ lệ funding đã biến đổi vào MongoDB
 
         Args:
             data: Dữ liệu tỷ lệ funding đã biến đổi
+            batch_size: Số operation trong mỗi lần bulk_write (mặc định tính theo kích thước bản ghi)
+            known_new: True khi biết trước các bản ghi chưa có trong DB (symbol mới, hoặc
+                chỉ gồm dữ liệu sau thời gian funding mới nhất): dùng insert_many thay vì
+                upsert, chỉ upsert các bản ghi bị trùng
+            preformatted: True khi bản ghi đã ở dạng lưu trữ (date/time là chuỗi, có
+                funding_time_ms), như output của TransformFundingData: bỏ qua bước
+                chuẩn hóa từng bản ghi
 
         Returns:
             True nếu thành công, False nếu không
@@ -286,69 +731,42 @@ class LoadMongo:
                 self.logger.warning("No transformed data to save")
                 return False
 
-            # Chuyển đổi thành DataFrame để xử lý hiệu quả
-            df = pd.DataFrame(data)
+            if preformatted:
+                records = data
+            else:
+                # Chuyển đổi đối tượng datetime thành chuỗi
+                records = self._stringify_datetimes(data)
 
-            # Chuyển đổi đối tượng datetime thành chuỗi
-            for col in df.columns:
-                if df[col].dtype == "object":
-                    # Kiểm tra xem cột có chứa đối tượng datetime không
-                    sample_val = df[col].iloc[0] if len(df) > 0 else None
-                    if isinstance(
-                        sample_val, (datetime.datetime, datetime.date, datetime.time)
-                    ):
-                        df[col] = df[col].astype(str)
+                # Lưu sẵn epoch ms để đọc thời gian mới nhất không cần parse
+                for item in records:
+                    if "funding_time_ms" not in item:
+                        item["funding_time_ms"] = self._funding_time_ms(
+                            item["funding_date"], item["funding_time"]
+                        )
 
             # Sử dụng single collection cho tất cả dữ liệu
-            collection = self.get_collection("history")
+            collection = self.history
 
             # Tạo indexes để cải thiện hiệu suất truy vấn - tối ưu RAM
-            try:
-                # Index chính cho history collection - compound index hiệu quả
-                collection.create_index(
-                    [("symbol", 1), ("funding_date", 1), ("funding_time", 1)],
-                    unique=True,
-                    background=True,  # Tạo index trong background để không block
-                )
-
-                # Index riêng cho queries thường dùng - sparse để tiết kiệm RAM
-                collection.create_index("funding_date", background=True, sparse=True)
-                collection.create_index("symbol", background=True, sparse=True)
-
-                # Index TTL để tự động xóa dữ liệu cũ (tùy chọn)
-                # collection.create_index("funding_date", expireAfterSeconds=365*24*60*60, background=True)  # 1 năm
+            self._ensure_indexes(collection, self._HISTORY_INDEXES)
 
-            except Exception as idx_error:
-                self.logger.warning(f"Index creation warning: {idx_error}")
+            if known_new:
+                records = self._insert_new_records(collection, records, batch_size)
 
             # Chuẩn bị bulk operations sử dụng pymongo UpdateOne
-            operations = []
-            records = df.to_dict("records")
-
-            for item in records:
-                operations.append(
-                    UpdateOne(
-                        filter={
-                            "symbol": item["symbol"],
-                            "funding_date": item["funding_date"],
-                            "funding_time": item["funding_time"],
-                        },
-                        update={"$set": item},
-                        upsert=True,
-                    )
-                )
+            # Generator: mỗi UpdateOne chỉ được tạo khi batch của nó được ghi
+            operations = (
+                self._upsert_operation(item, self._HISTORY_KEY_FIELDS)
+                for item in records
+            )
 
-            if operations:
+            if records:
                 # Xử lý theo batch để tránh vấn đề bộ nhớ
-                batch_size = 1000
-                total_upserted = 0
-                total_modified = 0
-
-                for i in range(0, len(operations), batch_size):
-                    batch = operations[i : i + batch_size]
-                    result = collection.bulk_write(batch, ordered=False)
-                    total_upserted += result.upserted_count
-                    total_modified += result.modified_count
+                if batch_size is None:
+                    batch_size = self._bulk_batch_size(records[0])
+                total_upserted, total_modified = self._bulk_write_batches(
+                    collection, operations, batch_size
+                )
 
                 self.logger.info(
                     f"Saved {total_upserted} new records to history collection (updated {total_modified})"
@@ -366,7 +784,7 @@ class LoadMongo:
     def save_realtime_data(
         self, collection_name: str, data: List[Dict[str, Any]]
     ) -> bool:
-        """Lưu dữ liệu tỷ lệ funding theo thời gian thực vào MongoDB sử dụng pandas để xử lý hiệu quả
+        """Lưu dữ liệu tỷ lệ funding theo thời gian thực vào MongoDB
 
         Args:
             collection_name: Tên collection để lưu
@@ -380,67 +798,32 @@ class LoadMongo:
                 self.logger.warning("No realtime data to save")
                 return False
 
-            # Convert to DataFrame for efficient processing
-            df = pd.DataFrame(data)
-
             # Convert datetime objects to strings
-            for col in df.columns:
-                if df[col].dtype == "object":
-                    # Check if column contains datetime objects
-                    sample_val = df[col].iloc[0] if len(df) > 0 else None
-                    if isinstance(
-                        sample_val, (datetime.datetime, datetime.date, datetime.time)
-                    ):
-                        df[col] = df[col].astype(str)
+            records = self._stringify_datetimes(data)
 
             collection = self.get_collection(collection_name)
 
             # Tạo indexes để cải thiện hiệu suất truy vấn - tối ưu cho realtime
-            try:
-                # Index chính cho realtime - compound index với TTL
-                collection.create_index(
-                    [("symbol", 1), ("event_time", 1)], unique=True, background=True
-                )
-
-                # Index cho date queries - sparse để tiết kiệm RAM
-                collection.create_index("date", background=True, sparse=True)
-                collection.create_index("symbol", background=True, sparse=True)
-
-            except Exception as idx_error:
-                self.logger.warning(f"Index creation warning: {idx_error}")
+            self._ensure_indexes(collection, self._REALTIME_EVENT_INDEXES)
 
             # Chuẩn bị bulk operations sử dụng pymongo UpdateOne
-            operations = []
-            records = df.to_dict("records")
-
-            for item in records:
-                operations.append(
-                    UpdateOne(
-                        filter={
-                            "symbol": item["symbol"],
-                            "event_time": item["event_time"],
-                        },
-                        update={"$set": item},
-                        upsert=True,
-                    )
-                )
+            operations = (
+                self._upsert_operation(item, self._REALTIME_EVENT_KEY_FIELDS)
+                for item in records
+            )
 
-            if operations:
+            if records:
                 # Xử lý theo batch
-                batch_size = 500
-                total_upserted = 0
-                total_modified = 0
-
-                for i in range(0, len(operations), batch_size):
-                    batch = operations[i : i + batch_size]
-                    result = collection.bulk_write(batch, ordered=False)
-                    total_upserted += result.upserted_count
-                    total_modified += result.modified_count
-
-                self.logger.debug(
-                    f"Saved {total_upserted} new realtime records (updated {total_modified})"
+                batch_size = self._bulk_batch_size(records[0])
+                total_upserted, total_modified = self._bulk_write_batches(
+                    collection, operations, batch_size
                 )
 
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug(
+                        f"Saved {total_upserted} new realtime records (updated {total_modified})"
+                    )
+
             return True
 
         except BulkWriteError as e:
@@ -450,12 +833,17 @@ class LoadMongo:
             self.logger.error(f"Error saving realtime data: {e}")
             return False
 
-    def update_realtime_funding_data(self, collection_name: str, data: List[Dict[str, Any]]) -> bool:
+    def update_realtime_funding_data(
+        self, collection_name: str, data: List[Dict[str, Any]], fast_insert: bool = False
+    ) -> bool:
         """Update realtime funding rate data using upsert
         
         Args:
             collection_name: Name of the collection to update
             data: List of funding rate data to update
+            fast_insert: Write with w=0 (do not wait for server acknowledgement).
+                Off by default: these latest-state upserts only run at funding hours,
+                so a lost write would not be corrected until the next cycle
             
         Returns:
             True if successful, False otherwise
@@ -467,48 +855,41 @@ class LoadMongo:
             collection = self.get_collection(collection_name)
 
             # Create indexes for efficient queries
-            try:
-                collection.create_index("symbol", unique=True, background=True)
-                collection.create_index("last_update_timestamp", background=True)
-            except Exception as idx_error:
-                self.logger.warning(f"Index creation warning: {idx_error}")
+            self._ensure_indexes(collection, self._REALTIME_LATEST_INDEXES)
 
             # Prepare bulk operations for upsert
-            operations = []
-            for item in data:
-                # For realtime collection, we only keep the latest record per symbol
-                # Remove update_date from filter to avoid accumulating daily records
-                operations.append(
-                    UpdateOne(
-                        filter={
-                            "symbol": item["symbol"],
-                        },
-                        update={"$set": item},
-                        upsert=True,
-                    )
-                )
+            # For realtime collection, we only keep the latest record per symbol
+            # Remove update_date from filter to avoid accumulating daily records
+            operations = [
+                self._upsert_operation(item, self._REALTIME_LATEST_KEY_FIELDS)
+                for item in data
+            ]
 
             if operations:
                 # Process in batches
-                batch_size = 100
-                total_upserted = 0
-                total_modified = 0
-
-                for i in range(0, len(operations), batch_size):
-                    batch = operations[i : i + batch_size]
-                    result = collection.bulk_write(batch, ordered=False)
-                    total_upserted += result.upserted_count
-                    total_modified += result.modified_count
-
-                self.logger.info(
-                    f"Updated {total_upserted} new funding records, modified {total_modified} existing records"
+                batch_size = self._bulk_batch_size(data[0])
+                if fast_insert:
+                    collection = collection.with_options(write_concern=self._UNACKNOWLEDGED)
+                total_upserted, total_modified = self._bulk_write_batches(
+                    collection, operations, batch_size
                 )
 
+                if fast_insert:
+                    self.logger.info(
+                        f"Sent {len(operations)} funding record upserts (unacknowledged)"
+                    )
+                else:
+                    self.logger.info(
+                        f"Updated {total_upserted} new funding records, modified {total_modified} existing records"
+                    )
+
             return True
 
         except BulkWriteError as e:
+            # Một phần bản ghi có thể đã ghi, nhưng không biết symbol nào: báo lỗi để
+            # caller không coi cả batch là đã cập nhật (verification sẽ kiểm tra lại)
             self.logger.warning(f"Bulk write error for funding data: {e.details}")
-            return True  # Some records might have been processed
+            return False
         except Exception as e:
             self.logger.error(f"Error updating realtime funding data: {e}")
             return False
@@ -527,48 +908,52 @@ class LoadMongo:
         """
         try:
             collection = self.get_collection(collection_name)
+            # hint lỗi nếu index chưa tồn tại, nên đảm bảo index trước
+            self._ensure_indexes(collection, self._REALTIME_LATEST_INDEXES)
             current_time = datetime.datetime.now(datetime.timezone.utc)
             cutoff_time = current_time - datetime.timedelta(seconds=max_age_seconds)
-            cutoff_timestamp = int(cutoff_time.timestamp() * 1000)
             
             # Query recent data for all symbols
             pipeline = [
                 {
                     "$match": {
                         "symbol": {"$in": symbols},
-                        "last_update_time": {"$gte": cutoff_timestamp}
+                        "last_update_time": {"$gte": cutoff_time}
                     }
                 },
+                {"$group": {"_id": None, "verified": {"$addToSet": "$symbol"}}},
+                # Diff on the server so only missing symbols come back over the wire
                 {
-                    "$group": {
-                        "_id": "$symbol",
-                        "latest_update": {"$max": "$last_update_time"},
-                        "count": {"$sum": 1}
+                    "$project": {
+                        "_id": 0,
+                        "verified_count": {"$size": "$verified"},
+                        "missing": {"$setDifference": [{"$literal": list(symbols)}, "$verified"]}
                     }
                 }
             ]
             
-            recent_data = list(collection.aggregate(pipeline))
-            symbols_with_recent_data = {item["_id"] for item in recent_data}
-            
-            # Find missing symbols
-            missing_symbols = [s for s in symbols if s not in symbols_with_recent_data]
-            
-            # Find stale symbols (older than cutoff but exists)
-            stale_symbols = []
-            for item in recent_data:
-                latest_update = datetime.datetime.fromtimestamp(
-                    item["latest_update"] / 1000, tz=datetime.timezone.utc
-                )
-                if latest_update < cutoff_time:
-                    stale_symbols.append(item["_id"])
+            result = next(
+                collection.aggregate(
+                    pipeline, hint=[("last_update_time", -1), ("symbol", 1)]
+                ),
+                None,
+            )
+            if result is None:
+                # No recent rows at all: nothing to group, every symbol is missing
+                verified_count = 0
+                missing_symbols = list(symbols)
+            else:
+                verified_count = result["verified_count"]
+                missing_symbols = result["missing"]
             
+            # $match already drops rows older than the cutoff, so a symbol returned
+            # by the pipeline can never be stale; kept in the result for callers
             verification_result = {
                 "total_symbols": len(symbols),
-                "verified_symbols": len(symbols_with_recent_data),
+                "verified_symbols": verified_count,
                 "missing_symbols": missing_symbols,
-                "stale_symbols": stale_symbols,
-                "success_rate": len(symbols_with_recent_data) / len(symbols) if symbols else 0,
+                "stale_symbols": [],
+                "success_rate": verified_count / len(symbols) if symbols else 0,
                 "cutoff_time": cutoff_time.isoformat(),
                 "verification_time": current_time.isoformat()
             }
@@ -602,27 +987,19 @@ class LoadMongo:
             collection = self.get_collection(collection_name)
             current_time = datetime.datetime.now(datetime.timezone.utc)
             start_time = current_time - datetime.timedelta(hours=hours_back)
-            start_timestamp = int(start_time.timestamp() * 1000)
             
             # Aggregation pipeline for statistics
             pipeline = [
                 {
                     "$match": {
-                        "last_update_time": {"$gte": start_timestamp}
+                        "last_update_time": {"$gte": start_time}
                     }
                 },
                 {
                     "$group": {
                         "_id": {
                             "symbol": "$symbol",
-                            "hour": {
-                                "$dateToString": {
-                                    "format": "%Y-%m-%d-%H",
-                                    "date": {
-                                        "$toDate": "$last_update_time"
-                                    }
-                                }
-                            }
+                            "hour": "$hour_bucket"
                         },
                         "count": {"$sum": 1},
                         "latest_update": {"$max": "$last_update_time"}
@@ -636,37 +1013,32 @@ class LoadMongo:
                         "latest_update": {"$max": "$latest_update"}
                     }
                 },
-                {
-                    "$group": {
-                        "_id": None,
-                        "unique_symbols": {"$sum": 1},
-                        "total_records": {"$sum": "$total_records"},
-                        "avg_hourly_updates": {"$avg": "$hourly_updates"},
-                        "symbols_info": {
-                            "$push": {
-                                "symbol": "$_id",
-                                "hourly_updates": "$hourly_updates",
-                                "total_records": "$total_records",
-                                "latest_update": "$latest_update"
-                            }
-                        }
-                    }
-                }
             ]
             
-            result = list(collection.aggregate(pipeline))
+            # Summarize per-symbol groups while streaming the cursor instead of
+            # $push-ing them into a single server-side document
+            symbols_info = []
+            total_records = 0
+            total_hourly_updates = 0
+            for doc in collection.aggregate(pipeline):
+                total_records += doc["total_records"]
+                total_hourly_updates += doc["hourly_updates"]
+                symbols_info.append({
+                    "symbol": doc["_id"],
+                    "hourly_updates": doc["hourly_updates"],
+                    "total_records": doc["total_records"],
+                    "latest_update": doc["latest_update"]
+                })
             
-            if result:
-                stats = result[0]
-                stats.pop("_id", None)
-                return stats
-            else:
-                return {
-                    "unique_symbols": 0,
-                    "total_records": 0,
-                    "avg_hourly_updates": 0,
-                    "symbols_info": []
-                }
+            unique_symbols = len(symbols_info)
+            return {
+                "unique_symbols": unique_symbols,
+                "total_records": total_records,
+                "avg_hourly_updates": (
+                    total_hourly_updates / unique_symbols if unique_symbols else 0
+                ),
+                "symbols_info": symbols_info
+            }
                 
         except Exception as e:
             self.logger.error(f"Error getting funding data stats: {e}")
@@ -1,11 +1,50 @@
+import logging
+import sys
+from bisect import bisect_right
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from datetime import datetime, timezone
 from src.config.config_logging import ConfigLogging
 from src.load.load_mongo import LoadMongo
 from src.utils.util_convert_datetime import UtilConvertDatetime
 
 
+# Cận dưới của từng mức (tăng dần) và nhãn tương ứng, dùng chung cho
+# phân loại từng giá trị lẫn cả cột
+_RATE_PERCENT_THRESHOLDS = (0.01, 0.1, 0.5, 1.0)
+_PRICE_THRESHOLDS = (1000, 10000, 50000, 100000)
+_CATEGORY_LABELS = ("very_low", "low", "medium", "high", "very_high")
+_CATEGORY_LABELS_ARRAY = np.array(_CATEGORY_LABELS)
+
+
+def _categorize_rates(funding_rates: np.ndarray) -> np.ndarray:
+    """Phân loại cả mảng tỷ lệ funding một lần bằng tìm kiếm nhị phân trên bảng ngưỡng
+
+    Args:
+        funding_rates: Mảng tỷ lệ funding
+
+    Returns:
+        Mảng chuỗi phân loại
+    """
+    levels = np.searchsorted(
+        _RATE_PERCENT_THRESHOLDS, np.abs(funding_rates) * 100, side="right"
+    )
+    return _CATEGORY_LABELS_ARRAY[levels]
+
+
+def _categorize_prices(prices: np.ndarray) -> np.ndarray:
+    """Phân loại cả mảng giá mark một lần bằng tìm kiếm nhị phân trên bảng ngưỡng
+
+    Args:
+        prices: Mảng giá mark
+
+    Returns:
+        Mảng chuỗi phân loại
+    """
+    return _CATEGORY_LABELS_ARRAY[np.searchsorted(_PRICE_THRESHOLDS, prices, side="right")]
+
+
 class TransformFundingData:
     """Biến đổi dữ liệu tỷ lệ funding để phân tích và lưu trữ"""
 
@@ -25,43 +64,94 @@ class TransformFundingData:
         Returns:
             Dữ liệu đã biến đổi với các trường bổ sung
         """
+        transformed_df = self.transform_funding_frame(raw_data)
+        if transformed_df.empty:
+            return []
+        return transformed_df.to_dict("records")
+
+    def transform_funding_frame(self, raw_data: List[Dict[str, Any]]) -> pd.DataFrame:
+        """Biến đổi dữ liệu funding thô, trả về dạng cột (DataFrame)
+
+        Dùng khi bước sau làm việc theo cột (ví dụ calculate_funding_stats),
+        tránh chuyển qua list dict rồi dựng lại DataFrame.
+
+        Args:
+            raw_data: Dữ liệu tỷ lệ funding thô từ API
+
+        Returns:
+            DataFrame đã biến đổi, rỗng nếu không có dữ liệu hoặc lỗi
+        """
         try:
             if not raw_data:
                 self.logger.warning("No data to transform")
-                return []
-
-            transformed_data = []
-
-            for record in raw_data:
-                try:
-                    # Chuyển đổi timestamp thành datetime và định dạng đúng
-                    funding_datetime = self.util_datetime.timestamp_to_datetime(
-                        record.get("fundingTime", 0)
-                    )
+                return pd.DataFrame()
+
+            # Xử lý theo cột thay vì vòng lặp Python từng bản ghi
+            df = pd.DataFrame.from_records(raw_data)
+
+            funding_ms = self._numeric_column(df, "fundingTime")
+            funding_rates = self._numeric_column(df, "fundingRate")
+            mark_prices = self._numeric_column(df, "markPrice")
+
+            # Bỏ các bản ghi có giá trị không chuyển được thành số
+            valid = funding_ms.notna() & funding_rates.notna() & mark_prices.notna()
+            skipped = len(df) - int(valid.sum())
+            if skipped:
+                self.logger.warning(f"Skipped {skipped} malformed records")
+
+            funding_ms = funding_ms[valid].astype("int64")
+            # Tính chuỗi ngày/giờ UTC bằng số học trên epoch, không tạo đối tượng
+            # date/time cho từng bản ghi (loại bỏ microsecond: làm tròn xuống tới giây)
+            funding_seconds = (funding_ms.to_numpy() // 1000).astype("datetime64[s]")
+            funding_iso = np.char.partition(np.datetime_as_string(funding_seconds), "T")
+            # Symbol lặp lại nhiều: mã hóa dạng category để mọi bản ghi dùng chung
+            # một đối tượng chuỗi (đã intern) cho mỗi symbol
+            symbols = (
+                df["symbol"]
+                .fillna("")
+                .astype(str)
+                .astype("category")
+                .cat.rename_categories(sys.intern)
+                if "symbol" in df
+                else ""
+            )
+
+            # Tạo bản ghi đã biến đổi chỉ với các trường bắt buộc
+            transformed_df = pd.DataFrame(
+                {
+                    "symbol": symbols,
+                    "funding_date": funding_iso[:, 0],
+                    "funding_time": funding_iso[:, 2],
+                    "fundingRate": funding_rates,
+                    "markPrice": mark_prices,
+                    # Epoch ms gốc, LoadMongo dùng trực tiếp không cần parse lại
+                    "funding_time_ms": funding_ms,
+                },
+                index=funding_ms.index,
+            )
 
-                    # Tạo bản ghi đã biến đổi chỉ với các trường bắt buộc
-                    transformed_record = {
-                        "symbol": record.get("symbol", ""),
-                        "funding_date": funding_datetime.date(),
-                        "funding_time": funding_datetime.time().replace(
-                            microsecond=0
-                        ),  # Loại bỏ microsecond
-                        "fundingRate": float(record.get("fundingRate", 0)),
-                        "markPrice": float(record.get("markPrice", 0)),
-                    }
+            self.logger.info(f"Transformed {len(transformed_df)} records")
+            return transformed_df
 
-                    transformed_data.append(transformed_record)
+        except Exception as e:
+            self.logger.error(f"Error in transform_funding_frame: {e}")
+            return pd.DataFrame()
 
-                except Exception as e:
-                    self.logger.warning(f"Error transforming record {record}: {e}")
-                    continue
+    @staticmethod
+    def _numeric_column(df: pd.DataFrame, column: str) -> pd.Series:
+        """Chuyển một cột thành số, giữ quy ước record.get(column, 0)
 
-            self.logger.info(f"Transformed {len(transformed_data)} records")
-            return transformed_data
+        Args:
+            df: DataFrame dữ liệu thô
+            column: Tên cột
 
-        except Exception as e:
-            self.logger.error(f"Error in transform_funding_data: {e}")
-            return []
+        Returns:
+            Series số: thiếu trường -> 0, không parse được -> NaN
+        """
+        if column not in df:
+            return pd.Series(0, index=df.index, dtype="float64")
+        raw = df[column]
+        return pd.to_numeric(raw, errors="coerce").mask(raw.isna(), 0)
 
     def transform_realtime_data(
         self, raw_data: List[Dict[str, Any]]
@@ -82,54 +172,37 @@ class TransformFundingData:
                 return []
 
             transformed_data = []
+            skipped = 0
+            debug_enabled = self.logger.isEnabledFor(logging.DEBUG)
+
+            append = transformed_data.append
+            intern = sys.intern
 
             for record in raw_data:
                 try:
-                    # Ánh xạ tên trường websocket thành tên đúng
-                    event_type = record.get("e", "")  # Loại sự kiện
-                    event_time = record.get("E", 0)  # Thời gian sự kiện
-                    symbol = record.get("s", "")  # Symbol
-                    mark_price = record.get("p", "0")  # Giá mark
-                    index_price = record.get("i", "0")  # Giá chỉ số
-                    funding_rate = record.get("r", "0")  # Tỷ lệ funding (trường đúng!)
-                    estimated_settle_price = record.get(
-                        "P", "0"
-                    )  # Giá thanh toán ước tính (đã bị dùng sai làm tỷ lệ funding)
-                    next_funding_time = record.get(
-                        "T", 0
-                    )  # Thời gian funding tiếp theo
-
-                    # Chuyển đổi thời gian sự kiện thành datetime
-                    event_datetime = self.util_datetime.timestamp_to_datetime(
-                        event_time
-                    )
-                    next_funding_datetime = self.util_datetime.timestamp_to_datetime(
-                        next_funding_time
-                    )
-
-                    # Create clean transformed record
-                    transformed_record = {
-                        "symbol": symbol,
-                        "mark_price": float(mark_price),
-                        "index_price": float(index_price),
-                        "funding_rate": float(funding_rate),
-                        "event_time": event_time,
-                        "next_funding_time": next_funding_time,
-                        "date": event_datetime.date().isoformat(),
-                        "time": event_datetime.time()
-                        .replace(microsecond=0)
-                        .isoformat(),
-                    }
-
-                    transformed_data.append(transformed_record)
+                    # Schema websocket cố định nên ánh xạ thẳng từng trường vào bản ghi,
+                    # bỏ qua các trường không lưu (e: loại sự kiện, P: giá thanh toán ước tính)
+                    get = record.get
+                    append({
+                        "symbol": intern(get("s", "")),  # Symbol
+                        "mark_price": float(get("p", "0")),  # Giá mark
+                        "index_price": float(get("i", "0")),  # Giá chỉ số
+                        "funding_rate": float(get("r", "0")),  # Tỷ lệ funding
+                        # Epoch ms gốc là nguồn thời gian duy nhất, định dạng khi đọc
+                        "event_time": get("E", 0),  # Thời gian sự kiện
+                        "next_funding_time": get("T", 0),  # Thời gian funding tiếp theo
+                    })
 
                 except Exception as e:
-                    self.logger.warning(
-                        f"Error transforming realtime record {record}: {e}"
-                    )
+                    # Chỉ format bản ghi lỗi khi bật DEBUG, tổng hợp một warning sau vòng lặp
+                    skipped += 1
+                    if debug_enabled:
+                        self.logger.debug("Error transforming realtime record %r: %s", record, e)
                     continue
 
-            self.logger.debug(f"Transformed {len(transformed_data)} realtime records")
+            if skipped:
+                self.logger.warning("Skipped %d malformed realtime records", skipped)
+            self.logger.debug("Transformed %d realtime records", len(transformed_data))
             return transformed_data
 
         except Exception as e:
@@ -145,18 +218,9 @@ class TransformFundingData:
         Returns:
             Chuỗi phân loại
         """
-        rate_percent = abs(funding_rate) * 100
-
-        if rate_percent >= 1.0:
-            return "very_high"
-        elif rate_percent >= 0.5:
-            return "high"
-        elif rate_percent >= 0.1:
-            return "medium"
-        elif rate_percent >= 0.01:
-            return "low"
-        else:
-            return "very_low"
+        return _CATEGORY_LABELS[
+            bisect_right(_RATE_PERCENT_THRESHOLDS, abs(funding_rate) * 100)
+        ]
 
     def _categorize_price(self, price: float) -> str:
         """Phân loại giá thành các khoảng khác nhau
@@ -167,60 +231,52 @@ class TransformFundingData:
         Returns:
             Chuỗi phân loại
         """
-        if price >= 100000:
-            return "very_high"
-        elif price >= 50000:
-            return "high"
-        elif price >= 10000:
-            return "medium"
-        elif price >= 1000:
-            return "low"
-        else:
-            return "very_low"
-
-    def calculate_funding_stats(self, data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return _CATEGORY_LABELS[bisect_right(_PRICE_THRESHOLDS, price)]
+
+    def calculate_funding_stats(
+        self, data: Union[List[Dict[str, Any]], pd.DataFrame]
+    ) -> Dict[str, Any]:
         """Tính toán thống kê cho dữ liệu tỷ lệ funding
 
         Args:
-            data: Dữ liệu tỷ lệ funding
+            data: Dữ liệu tỷ lệ funding (list dict hoặc DataFrame đã biến đổi)
 
         Returns:
             Từ điển thống kê
         """
         try:
-            if not data:
+            if len(data) == 0:
                 return {}
 
-            df = pd.DataFrame(data)
+            df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+
+            funding_rates = df["fundingRate"]
+            # Một lần agg cho cả 5 chỉ số thay vì quét cột 5 lần
+            rate_stats = funding_rates.agg(["mean", "median", "std", "min", "max"]).to_dict()
+            date_range = df["funding_date"].agg(["min", "max"])
+            # value_counts cho cả số symbol duy nhất lẫn top symbol (symbol dạng
+            # category vẫn liệt kê category không còn bản ghi, nên bỏ count 0)
+            symbol_counts = df["symbol"].value_counts()
+            symbol_counts = symbol_counts[symbol_counts > 0]
+            # Phân loại không được lưu, tính cho cả cột một lần
+            categories = _categorize_rates(funding_rates.to_numpy(dtype="float64"))
 
             stats = {
                 "total_records": len(data),
-                "unique_symbols": df["symbol"].nunique(),
+                "unique_symbols": len(symbol_counts),
                 "date_range": {
-                    "start": df["funding_date"].min(),
-                    "end": df["funding_date"].max(),
-                },
-                "funding_rate_stats": {
-                    "mean": df["fundingRate"].mean(),
-                    "median": df["fundingRate"].median(),
-                    "std": df["fundingRate"].std(),
-                    "min": df["fundingRate"].min(),
-                    "max": df["fundingRate"].max(),
+                    "start": date_range["min"],
+                    "end": date_range["max"],
                 },
+                "funding_rate_stats": rate_stats,
+                # Phần trăm là phép nhân tuyến tính nên suy ra từ thống kê gốc
                 "funding_rate_percent_stats": {
-                    "mean": df["funding_rate_percent"].mean(),
-                    "median": df["funding_rate_percent"].median(),
-                    "std": df["funding_rate_percent"].std(),
-                    "min": df["funding_rate_percent"].min(),
-                    "max": df["funding_rate_percent"].max(),
+                    key: value * 100 for key, value in rate_stats.items()
                 },
-                "category_distribution": df["funding_rate_category"]
+                "category_distribution": pd.Series(categories)
                 .value_counts()
                 .to_dict(),
-                "top_symbols_by_volume": df.groupby("symbol")["fundingRate"]
-                .count()
-                .nlargest(10)
-                .to_dict(),
+                "top_symbols_by_volume": symbol_counts.nlargest(10).to_dict(),
             }
 
             return stats
@@ -251,29 +307,38 @@ class TransformFundingData:
                 self.logger.warning("No raw data to transform")
                 return False
 
-            # Transform data
-            transformed_data = self.transform_funding_data(raw_data)
+            # Transform data (dạng cột, thống kê dùng trực tiếp)
+            transformed_df = self.transform_funding_frame(raw_data)
 
-            if not transformed_data:
+            if transformed_df.empty:
                 self.logger.error("Failed to transform data")
                 return False
 
-            # Calculate statistics
-            stats = self.calculate_funding_stats(transformed_data)
-
             # Save transformed data to MongoDB
-            if self.load_mongo.save_transformed_funding_data(transformed_data):
+            transformed_data = transformed_df.to_dict("records")
+            if self.load_mongo.save_transformed_funding_data(
+                transformed_data, preformatted=True
+            ):
                 self.logger.info("Transformed data saved to MongoDB")
             else:
                 self.logger.error("Failed to save transformed data")
                 return False
 
-            # Log statistics
+            # Log statistics: hai con số INFO không cần tính thống kê đầy đủ
             self.logger.info("Transformation Statistics:")
-            self.logger.info(f"  Total records: {stats.get('total_records', 0)}")
-            self.logger.info(f"  Unique symbols: {stats.get('unique_symbols', 0)}")
-            self.logger.info(".6f")
-            self.logger.info(".6f")
+            self.logger.info(f"  Total records: {len(transformed_df)}")
+            self.logger.info(f"  Unique symbols: {transformed_df['symbol'].nunique()}")
+            if self.logger.isEnabledFor(logging.DEBUG):
+                stats = self.calculate_funding_stats(transformed_df)
+                rate_stats = stats.get("funding_rate_stats", {})
+                self.logger.debug(
+                    "  Funding rate mean: %.6f, std: %.6f",
+                    rate_stats.get("mean", 0),
+                    rate_stats.get("std", 0),
+                )
+                self.logger.debug(
+                    "  Category distribution: %s", stats.get("category_distribution", {})
+                )
 
             self.logger.info("Funding data transformation completed successfully")
             return True
@@ -374,6 +439,8 @@ class TransformFundingData:
 
             transformed_data = []
             current_time = datetime.now(timezone.utc)
+            skipped = 0
+            debug_enabled = self.logger.isEnabledFor(logging.DEBUG)
 
             for record in raw_data:
                 try:
@@ -428,15 +495,25 @@ class TransformFundingData:
                         "funding_cap": funding_cap,
                         "funding_floor": funding_floor,
                         "update_date": current_time.date().isoformat(),
-                        "update_time": current_time.time().replace(microsecond=0).isoformat()
+                        "update_time": current_time.time().replace(microsecond=0).isoformat(),
+                        # Lưu dạng BSON Date để truy vấn theo khoảng thời gian không cần $toDate
+                        "last_update_time": current_time,
+                        # Bucket giờ tính sẵn cho get_funding_data_stats
+                        "hour_bucket": current_time.strftime("%Y-%m-%d-%H")
                     }
 
                     transformed_data.append(transformed_record)
 
                 except Exception as e:
-                    self.logger.warning(f"Error transforming realtime funding record {record}: {e}")
+                    skipped += 1
+                    if debug_enabled:
+                        self.logger.debug(
+                            "Error transforming realtime funding record %r: %s", record, e
+                        )
                     continue
 
+            if skipped:
+                self.logger.warning("Skipped %d malformed realtime funding records", skipped)
             self.logger.info(f"Transformed {len(transformed_data)} realtime funding records")
             return transformed_data
 
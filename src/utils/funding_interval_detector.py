@@ -3,21 +3,81 @@ Funding Interval Detection and Cache System
 Tự động phát hiện interval funding (4h vs 8h) dựa trên pattern của nextFundingTime
 """
 
+import atexit
 import json
 import requests
+import tempfile
+import threading
 import time
+from collections import deque
 from datetime import datetime, timezone
 from typing import Dict, List, Optional
 import os
 from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Session HTTP dùng chung cho mọi detector trong process (giữ kết nối keep-alive)
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    """Lấy session HTTP dùng chung, tạo mới ở lần gọi đầu tiên
+
+    Returns:
+        Đối tượng requests.Session
+    """
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                session = requests.Session()
+                # Retry lỗi tạm thời (rate limit, 5xx) ngay trên kết nối đang mở
+                retry = Retry(
+                    total=3,
+                    backoff_factor=0.3,
+                    status_forcelist=(429, 500, 502, 503, 504),
+                    allowed_methods=frozenset(["GET"]),
+                )
+                adapter = HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=retry)
+                session.mount("https://", adapter)
+                atexit.register(session.close)
+                _SESSION = session
+    return _SESSION
+
+
+# Số bản ghi detection_history giữ lại (deque tự bỏ bản ghi cũ nhất)
+DETECTION_HISTORY_LIMIT = 100
+
+# Interval theo giờ funding UTC (0-23), tính sẵn một lần:
+# - giờ chia hết cho 8 (0, 8, 16): có thể là 8h hoặc 4h, mặc định 8h cho safety
+# - giờ chia hết cho 4 còn lại (4, 12, 20): chắc chắn là 4h
+# - không match pattern nào: mặc định 8h
+_HOUR_INTERVALS = tuple(
+    "4h" if hour % 4 == 0 and hour % 8 != 0 else "8h" for hour in range(24)
+)
 
 class FundingIntervalDetector:
     """Phát hiện và cache thông tin interval funding cho symbols"""
+
+    # Response premiumIndex dùng chung giữa các instance trong process
+    PREMIUM_INDEX_TTL = 60  # giây
+    _premium_index_cache: Optional[tuple] = None  # (thời điểm lấy, data)
     
     def __init__(self, cache_file: str = "funding_intervals_cache.json"):
         self.base_url = "https://fapi.binance.com"
         self.cache_file = cache_file
         self.cache_data = self._load_cache()
+        # Ghi cache: _save_seq đánh số snapshot theo thứ tự, một writer nền duy nhất
+        # chỉ ghi snapshot mới nhất; _file_lock tuần tự hóa việc ghi/xóa file và
+        # bỏ qua snapshot cũ hơn bản đã ghi (_written_seq)
+        self._write_lock = threading.Lock()
+        self._save_seq = 0
+        self._pending_write = None  # (seq, payload, symbol_count) chờ writer nền
+        self._writer_thread = None
+        self._file_lock = threading.Lock()
+        self._written_seq = 0
         
     def _load_cache(self) -> Dict:
         """Load cache từ file JSON"""
@@ -25,6 +85,9 @@ class FundingIntervalDetector:
             if os.path.exists(self.cache_file):
                 with open(self.cache_file, 'r', encoding='utf-8') as f:
                     data = json.load(f)
+                    data["detection_history"] = deque(
+                        data.get("detection_history", []), maxlen=DETECTION_HISTORY_LIMIT
+                    )
                     print(f"Loaded cache with {len(data.get('intervals', {}))} symbols")
                     return data
         except Exception as e:
@@ -33,18 +96,94 @@ class FundingIntervalDetector:
         return {
             "last_updated": None,
             "intervals": {},
-            "detection_history": []
+            "detection_history": deque(maxlen=DETECTION_HISTORY_LIMIT)
         }
     
-    def _save_cache(self):
-        """Save cache to file JSON"""
+    def _save_cache(self, background: bool = False):
+        """
+        Save cache to file JSON
+        
+        Args:
+            background: Ghi file ở thread riêng, caller không phải chờ disk I/O
+        """
+        try:
+            with self._write_lock:
+                self.cache_data["last_updated"] = datetime.now(timezone.utc).isoformat()
+                # Serialize ngay (snapshot), chỉ phần ghi file chạy nền nên không
+                # bị ảnh hưởng nếu cache_data thay đổi sau đó; số thứ tự cấp cùng lúc
+                # nên snapshot sau luôn có seq lớn hơn
+                # Ghi dạng gọn (không indent): file chỉ do chương trình đọc lại
+                payload = json.dumps(self.cache_data, separators=(',', ':'), default=list)
+                self._save_seq += 1
+                item = (self._save_seq, payload, len(self.cache_data['intervals']))
+                
+                if background:
+                    # Writer đang chạy sẽ lấy snapshot mới nhất; snapshot chờ cũ hơn bị thay thế
+                    self._pending_write = item
+                    if self._writer_thread is None:
+                        # Không dùng daemon để process chờ ghi xong trước khi thoát
+                        self._writer_thread = threading.Thread(
+                            target=self._cache_writer, name="interval-cache-writer"
+                        )
+                        self._writer_thread.start()
+                    return
+        except Exception as e:
+            print(f"Error saving cache: {e}")
+            return
+        
+        self._write_cache_file(*item)
+    
+    def _cache_writer(self):
+        """Writer nền: ghi snapshot đang chờ cho tới khi không còn snapshot mới"""
+        while True:
+            with self._write_lock:
+                item, self._pending_write = self._pending_write, None
+                if item is None:
+                    self._writer_thread = None
+                    return
+            self._write_cache_file(*item)
+    
+    def _write_cache_file(self, seq: int, payload: str, symbol_count: int):
+        """Ghi nội dung cache đã serialize ra file (ghi file tạm rồi rename)
+
+        Args:
+            seq: Số thứ tự snapshot; bỏ qua nếu file đã có snapshot mới hơn
+            payload: Nội dung JSON
+            symbol_count: Số symbol trong snapshot (để log)
+        """
+        with self._file_lock:
+            if seq <= self._written_seq or not self._replace_cache_file(payload):
+                return
+            self._written_seq = seq
+        print(f"Cache saved with {symbol_count} symbols")
+    
+    def _replace_cache_file(self, payload: str) -> bool:
+        """Ghi payload ra file tạm rồi os.replace vào cache_file
+
+        Returns:
+            True nếu ghi thành công, False nếu không
+        """
+        tmp_path = None
         try:
-            self.cache_data["last_updated"] = datetime.now(timezone.utc).isoformat()
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache_data, f, indent=2, ensure_ascii=False)
-            print(f"Cache saved with {len(self.cache_data['intervals'])} symbols")
+            # File tạm cùng thư mục để os.replace là thao tác atomic; crash giữa
+            # chừng chỉ bỏ lại file tạm, cache cũ vẫn nguyên vẹn
+            cache_dir = os.path.dirname(os.path.abspath(self.cache_file))
+            fd, tmp_path = tempfile.mkstemp(
+                prefix=f"{os.path.basename(self.cache_file)}.", suffix=".tmp", dir=cache_dir
+            )
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.cache_file)
+            tmp_path = None
+            return True
         except Exception as e:
             print(f"Error saving cache: {e}")
+            return False
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
     
     def detect_funding_intervals(self, symbols: List[str], force_update: bool = False) -> Dict[str, str]:
         """
@@ -68,7 +207,7 @@ class FundingIntervalDetector:
                 else:
                     symbols_to_detect.append(symbol)
         else:
-            symbols_to_detect = symbols.copy()
+            symbols_to_detect = list(symbols)
         
         if not symbols_to_detect:
             print("All symbols found in cache")
@@ -77,7 +216,9 @@ class FundingIntervalDetector:
         print(f"Detecting intervals for {len(symbols_to_detect)} symbols...")
         
         # Phát hiện interval mới
-        detected_intervals = self._analyze_funding_patterns(symbols_to_detect)
+        detected_intervals = self._analyze_funding_patterns(
+            symbols_to_detect, use_cached_response=not force_update
+        )
         
         # Update cache và result
         for symbol, interval in detected_intervals.items():
@@ -86,11 +227,42 @@ class FundingIntervalDetector:
         
         # Save cache
         if detected_intervals:
-            self._save_cache()
+            self._save_cache(background=True)
         
         return result
     
-    def _analyze_funding_patterns(self, symbols: List[str]) -> Dict[str, str]:
+    def _fetch_premium_index(self, use_cached_response: bool = True) -> Optional[List[Dict]]:
+        """
+        Lấy dữ liệu premiumIndex, dùng lại response trong PREMIUM_INDEX_TTL giây
+        
+        Args:
+            use_cached_response: Cho phép dùng response đã cache còn hạn
+            
+        Returns:
+            List dữ liệu premiumIndex hoặc None nếu request lỗi
+        """
+        cached = FundingIntervalDetector._premium_index_cache
+        if (
+            use_cached_response
+            and cached is not None
+            and time.monotonic() - cached[0] < self.PREMIUM_INDEX_TTL
+        ):
+            return cached[1]
+        
+        url = f"{self.base_url}/fapi/v1/premiumIndex"
+        response = _get_session().get(url, timeout=(3.05, 27))
+        
+        if response.status_code != 200:
+            print(f"API request failed: {response.status_code}")
+            return None
+        
+        data = response.json()
+        FundingIntervalDetector._premium_index_cache = (time.monotonic(), data)
+        return data
+    
+    def _analyze_funding_patterns(
+        self, symbols: List[str], use_cached_response: bool = True
+    ) -> Dict[str, str]:
         """
         Phân tích pattern funding time để xác định interval
         
@@ -100,27 +272,21 @@ class FundingIntervalDetector:
         """
         try:
             # Get current funding data
-            url = f"{self.base_url}/fapi/v1/premiumIndex"
-            response = requests.get(url, timeout=30)
-            
-            if response.status_code != 200:
-                print(f"API request failed: {response.status_code}")
+            data = self._fetch_premium_index(use_cached_response)
+            if data is None:
                 return {}
             
-            data = response.json()
-            current_time = int(time.time() * 1000)
             result = {}
+            detection_history = self.cache_data["detection_history"]
+            detection_time = datetime.now(timezone.utc).isoformat()
             
-            # Lọc data cho symbols cần phát hiện
-            symbol_data = {}
+            # Lọc và phân tích trong cùng một vòng lặp (set: kiểm tra thành viên O(1))
+            symbol_set = frozenset(symbols)
             for item in data:
-                if item['symbol'] in symbols:
-                    symbol_data[item['symbol']] = item
-            
-            print(f"Found API data for {len(symbol_data)} symbols")
-            
-            # Phân tích từng symbol
-            for symbol, item in symbol_data.items():
+                symbol = item['symbol']
+                if symbol not in symbol_set:
+                    continue
+                
                 next_funding_time = int(item.get('nextFundingTime', 0))
                 
                 if next_funding_time == 0:
@@ -142,13 +308,9 @@ class FundingIntervalDetector:
                     "next_funding_time": next_funding_dt.isoformat(),
                     "next_funding_hour": next_funding_hour,
                     "detected_interval": interval,
-                    "detection_time": datetime.now(timezone.utc).isoformat()
+                    "detection_time": detection_time
                 }
-                self.cache_data["detection_history"].append(detection_record)
-            
-            # Giữ lại 100 records gần nhất
-            if len(self.cache_data["detection_history"]) > 100:
-                self.cache_data["detection_history"] = self.cache_data["detection_history"][-100:]
+                detection_history.append(detection_record)
             
             print(f"Detected intervals for {len(result)} symbols")
             return result
@@ -157,7 +319,8 @@ class FundingIntervalDetector:
             print(f"Error analyzing funding patterns: {e}")
             return {}
     
-    def _determine_interval_from_hour(self, hour: int) -> str:
+    @staticmethod
+    def _determine_interval_from_hour(hour: int) -> str:
         """
         Xác định interval dựa trên giờ funding
         
@@ -165,16 +328,7 @@ class FundingIntervalDetector:
         - 8h funding: 0, 8, 16 (chia hết cho 8)
         - 4h funding: 0, 4, 8, 12, 16, 20 (chia hết cho 4 nhưng không chia hết cho 8)
         """
-        if hour % 8 == 0:
-            # Có thể là 8h (0, 8, 16) hoặc 4h (0, 8, 16 cũng có trong 4h)
-            # Cần logic bổ sung, tạm thời mặc định 8h cho safety
-            return "8h"
-        elif hour % 4 == 0:
-            # 4, 12, 20 - chắc chắn là 4h
-            return "4h"
-        else:
-            # Không match pattern nào, mặc định 8h
-            return "8h"
+        return _HOUR_INTERVALS[hour]
     
     def get_cached_intervals(self) -> Dict[str, str]:
         """Lấy tất cả intervals đã cache"""
@@ -194,13 +348,21 @@ class FundingIntervalDetector:
     
     def clear_cache(self):
         """Xóa cache"""
-        self.cache_data = {
-            "last_updated": None,
-            "intervals": {},
-            "detection_history": []
-        }
-        if os.path.exists(self.cache_file):
-            os.remove(self.cache_file)
+        with self._write_lock:
+            self.cache_data = {
+                "last_updated": None,
+                "intervals": {},
+                "detection_history": deque(maxlen=DETECTION_HISTORY_LIMIT)
+            }
+            # Hủy snapshot đang chờ; snapshot nào đang ghi dở cũng cũ hơn cleared_seq
+            self._pending_write = None
+            cleared_seq = self._save_seq
+        
+        # Chờ lần ghi đang chạy (nếu có) xong rồi mới xóa, và chặn snapshot cũ ghi lại file
+        with self._file_lock:
+            self._written_seq = max(self._written_seq, cleared_seq)
+            if os.path.exists(self.cache_file):
+                os.remove(self.cache_file)
         print("Cache cleared")
 
 
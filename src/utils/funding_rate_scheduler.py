@@ -6,9 +6,11 @@ Scheduler thông minh cho funding rate với kiểm tra dữ liệu và thông b
 import time
 import schedule
 import threading
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from typing import List, Dict, Any, Optional, Tuple
 import traceback
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from src.config.config_logging import ConfigLogging
 from src.utils.util_tele_bot_check import UtilTeleBotCheck
@@ -23,6 +25,12 @@ class FundingRateScheduler:
     Lập lịch thông minh với kiểm tra dữ liệu và thông báo có điều kiện
     """
     
+    # Giờ funding (UTC) của từng chu kỳ
+    FUNDING_HOURS_8H = (0, 8, 16)
+    FUNDING_HOURS_4H = (0, 4, 8, 12, 16, 20)
+    _CYCLE_HOURS = {"8h": 8, "4h": 4}
+    EXTRACT_BATCH_SIZE = 20
+    
     def __init__(self, symbols: List[str]):
         self.logger = ConfigLogging.config_logging("FundingRateScheduler")
         self.tele_bot = UtilTeleBotCheck()
@@ -34,6 +42,16 @@ class FundingRateScheduler:
         self.symbols = symbols
         self.is_running = False
         self.scheduler_thread = None
+        self._extract_pool = None  # Pool chạy song song các batch extraction, tạo lại mỗi lần start
+        self._verify_pool = None  # Một luồng riêng cho verification để không chặn vòng scheduler
+        
+        # Scheduler riêng để không dùng chung (và không clear) job list toàn cục
+        self.scheduler = schedule.Scheduler()
+        self._stop_event = threading.Event()  # Đánh thức vòng scheduler ngay khi dừng
+        
+        # Cảnh báo verification gom lại, gửi một tin nhắn Telegram mỗi lần kiểm tra
+        self._alert_buffer = []
+        self._alert_lock = threading.Lock()
         
         # Symbol categorization
         self.symbols_8h = []
@@ -47,6 +65,9 @@ class FundingRateScheduler:
         self.last_8h_execution = None
         self.last_4h_execution = None
         
+        # (thời điểm, symbol lỗi) của lần extraction gần nhất theo interval; không có key = chưa biết
+        self._last_cycle_failed = {}
+        
     def start_scheduler(self) -> bool:
         """Start the funding rate scheduler"""
         try:
@@ -61,7 +82,12 @@ class FundingRateScheduler:
             self._setup_funding_schedules()
             self._setup_verification_schedules()
             
+            # Pool giữ luồng sống suốt vòng đời scheduler, không tạo lại mỗi chu kỳ
+            self._extract_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="fr-extract")
+            self._verify_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fr-verify")
+            
             # Start scheduler thread
+            self._stop_event.clear()
             self.is_running = True
             self.scheduler_thread = threading.Thread(target=self._run_scheduler, daemon=True)
             self.scheduler_thread.start()
@@ -92,14 +118,22 @@ class FundingRateScheduler:
                 
             self.logger.info("Stopping funding rate scheduler")
             self.is_running = False
+            self._stop_event.set()
             
             # Clear all schedules
-            schedule.clear()
+            self.scheduler.clear()
             
             # Wait for scheduler thread
             if self.scheduler_thread and self.scheduler_thread.is_alive():
                 self.scheduler_thread.join(timeout=10)
             
+            if self._extract_pool:
+                self._extract_pool.shutdown(wait=False, cancel_futures=True)
+                self._extract_pool = None
+            if self._verify_pool:
+                self._verify_pool.shutdown(wait=False, cancel_futures=True)
+                self._verify_pool = None
+            
             self.logger.info("Funding rate scheduler stopped")
             return True
             
@@ -115,17 +149,17 @@ class FundingRateScheduler:
             # Get intervals from detector
             intervals = self.interval_detector.detect_funding_intervals(self.symbols)
             
-            # Reset lists
-            self.symbols_8h = []
-            self.symbols_4h = []
-            
-            # Categorize
+            # Categorize: chia một lượt theo interval, giữ thứ tự symbol ban đầu
+            buckets = defaultdict(list)
             for symbol in self.symbols:
-                interval = intervals.get(symbol, "8h")
-                if interval == "4h":
-                    self.symbols_4h.append(symbol)
-                else:
-                    self.symbols_8h.append(symbol)
+                buckets[intervals.get(symbol, "8h")].append(symbol)
+            
+            self.symbols_4h = buckets.pop("4h", [])
+            self.symbols_8h = buckets.pop("8h", [])
+            
+            # Interval lạ (detector chỉ trả 4h/8h) vẫn xếp vào 8h như trước
+            for other in buckets.values():
+                self.symbols_8h.extend(other)
             
             self.logger.info(f"Symbol categorization completed:")
             self.logger.info(f"  8h symbols: {len(self.symbols_8h)}")
@@ -140,22 +174,13 @@ class FundingRateScheduler:
     def _setup_funding_schedules(self):
         """Setup funding rate extraction schedules"""
         try:
-            # 8-hour funding schedules (00:00, 08:00, 16:00 UTC)
-            if self.symbols_8h:
-                schedule.every().day.at("00:00").do(self._execute_8h_funding)
-                schedule.every().day.at("08:00").do(self._execute_8h_funding)
-                schedule.every().day.at("16:00").do(self._execute_8h_funding)
-                self.logger.info("8h funding schedules setup completed")
+            # Mỗi giờ funding chỉ một job: giờ trùng (00:00, 08:00, 16:00 UTC) chạy cả 8h và 4h
+            # trong cùng một lần, thay vì hai job tranh nhau pool HTTP và kết nối Mongo
+            hours = self._active_funding_hours()
+            for hour in hours:
+                self.scheduler.every().day.at(f"{hour:02d}:00").do(self._execute_funding_at, hour)
             
-            # 4-hour funding schedules (00:00, 04:00, 08:00, 12:00, 16:00, 20:00 UTC)
-            if self.symbols_4h:
-                schedule.every().day.at("00:00").do(self._execute_4h_funding)
-                schedule.every().day.at("04:00").do(self._execute_4h_funding)
-                schedule.every().day.at("08:00").do(self._execute_4h_funding)
-                schedule.every().day.at("12:00").do(self._execute_4h_funding)
-                schedule.every().day.at("16:00").do(self._execute_4h_funding)
-                schedule.every().day.at("20:00").do(self._execute_4h_funding)
-                self.logger.info("4h funding schedules setup completed")
+            self.logger.info(f"Funding schedules setup completed ({len(hours)} jobs)")
                 
         except Exception as e:
             self.logger.error(f"Error setting up funding schedules: {e}")
@@ -163,119 +188,159 @@ class FundingRateScheduler:
     def _setup_verification_schedules(self):
         """Setup data verification schedules (5 minutes after funding times)"""
         try:
-            # 8h verification schedules
-            if self.symbols_8h:
-                schedule.every().day.at("00:05").do(self._verify_8h_data)
-                schedule.every().day.at("08:05").do(self._verify_8h_data)
-                schedule.every().day.at("16:05").do(self._verify_8h_data)
-            
-            # 4h verification schedules  
-            if self.symbols_4h:
-                schedule.every().day.at("00:05").do(self._verify_4h_data)
-                schedule.every().day.at("04:05").do(self._verify_4h_data)
-                schedule.every().day.at("08:05").do(self._verify_4h_data)
-                schedule.every().day.at("12:05").do(self._verify_4h_data)
-                schedule.every().day.at("16:05").do(self._verify_4h_data)
-                schedule.every().day.at("20:05").do(self._verify_4h_data)
+            for hour in self._active_funding_hours():
+                self.scheduler.every().day.at(f"{hour:02d}:05").do(self._queue_verification, hour)
             
             self.logger.info("Data verification schedules setup completed")
             
         except Exception as e:
             self.logger.error(f"Error setting up verification schedules: {e}")
     
+    def _active_funding_hours(self) -> List[int]:
+        """Các giờ UTC có ít nhất một chu kỳ funding cần chạy
+
+        Returns:
+            Danh sách giờ đã sắp xếp, không trùng lặp
+        """
+        hours = set()
+        if self.symbols_8h:
+            hours.update(self.FUNDING_HOURS_8H)
+        if self.symbols_4h:
+            hours.update(self.FUNDING_HOURS_4H)
+        return sorted(hours)
+    
+    def _due_cycles(self, hour: int) -> List[Tuple[str, List[str]]]:
+        """Các chu kỳ (interval, symbols) đến hạn tại giờ UTC này
+
+        Args:
+            hour: Giờ funding UTC (0-23)
+
+        Returns:
+            Danh sách (interval, symbols), bỏ qua chu kỳ không có symbol
+        """
+        cycles = []
+        if hour in self.FUNDING_HOURS_8H and self.symbols_8h:
+            cycles.append(("8h", self.symbols_8h))
+        if hour in self.FUNDING_HOURS_4H and self.symbols_4h:
+            cycles.append(("4h", self.symbols_4h))
+        return cycles
+    
     def _run_scheduler(self):
         """Main scheduler loop"""
         while self.is_running:
             try:
-                schedule.run_pending()
-                time.sleep(30)  # Check every 30 seconds
+                self.scheduler.run_pending()
+                
+                # Ngủ tới đúng job kế tiếp (tối đa 60s); stop_scheduler đánh thức ngay lập tức
+                idle = self.scheduler.idle_seconds
+                sleep_for = 60 if idle is None else max(0.5, min(idle, 60))
+                if self._stop_event.wait(timeout=sleep_for):
+                    break
             except Exception as e:
                 self.logger.error(f"Error in scheduler loop: {e}")
-                time.sleep(60)
+                if self._stop_event.wait(timeout=60):
+                    break
+    
+    def _execute_funding_at(self, hour: int):
+        """Chạy mọi chu kỳ funding đến hạn tại giờ UTC này trong một lần
+
+        Args:
+            hour: Giờ funding UTC (0-23)
+        """
+        self._run_funding_cycles(self._due_cycles(hour))
     
     def _execute_8h_funding(self):
         """Execute 8h funding rate extraction"""
         if not self.symbols_8h:
             return
-            
-        try:
-            self.logger.info(f"Starting 8h funding extraction for {len(self.symbols_8h)} symbols")
-            
-            # Send start notification
-            current_time = datetime.now(timezone.utc)
-            next_funding = current_time.replace(minute=0, second=0, microsecond=0) + timedelta(hours=8)
-            
-            self.tele_bot.send_funding_cycle_start(
-                "8h", 
-                len(self.symbols_8h),
-                next_funding.strftime("%Y-%m-%d %H:%M UTC")
-            )
-            
-            # Execute extraction
-            start_time = time.time()
-            result = self._extract_funding_data(self.symbols_8h, "8h")
-            execution_time = time.time() - start_time
-            
-            # Send result notification
-            self.tele_bot.send_funding_update_result(
-                "8h",
-                result["success_count"],
-                result["total_count"], 
-                result["failed_symbols"],
-                execution_time
-            )
-            
-            self.last_8h_execution = datetime.now(timezone.utc)
-            
-        except Exception as e:
-            self.logger.error(f"Error in 8h funding execution: {e}")
-            self.tele_bot.send_alert(
-                "8H Funding Extraction Error",
-                f"Failed to execute 8h funding extraction\\n\\nError: {str(e)}",
-                "ERROR"
-            )
+        
+        self._run_funding_cycles([("8h", self.symbols_8h)])
     
     def _execute_4h_funding(self):
         """Execute 4h funding rate extraction"""
         if not self.symbols_4h:
             return
-            
-        try:
-            self.logger.info(f"Starting 4h funding extraction for {len(self.symbols_4h)} symbols")
-            
-            # Send start notification
-            current_time = datetime.now(timezone.utc)
-            next_funding = current_time.replace(minute=0, second=0, microsecond=0) + timedelta(hours=4)
-            
-            self.tele_bot.send_funding_cycle_start(
-                "4h",
-                len(self.symbols_4h),
-                next_funding.strftime("%Y-%m-%d %H:%M UTC")
-            )
-            
-            # Execute extraction
-            start_time = time.time()
-            result = self._extract_funding_data(self.symbols_4h, "4h")
-            execution_time = time.time() - start_time
-            
-            # Send result notification
-            self.tele_bot.send_funding_update_result(
-                "4h",
-                result["success_count"],
-                result["total_count"],
-                result["failed_symbols"], 
-                execution_time
-            )
-            
-            self.last_4h_execution = datetime.now(timezone.utc)
-            
-        except Exception as e:
-            self.logger.error(f"Error in 4h funding execution: {e}")
-            self.tele_bot.send_alert(
-                "4H Funding Extraction Error", 
-                f"Failed to execute 4h funding extraction\\n\\nError: {str(e)}",
-                "ERROR"
-            )
+        
+        self._run_funding_cycles([("4h", self.symbols_4h)])
+    
+    def _run_funding_cycles(self, cycles: List[Tuple[str, List[str]]]):
+        """Trích xuất funding cho một hoặc nhiều chu kỳ cùng lúc
+
+        Batch của mọi chu kỳ được đưa vào pool trước rồi mới chờ kết quả,
+        nên ở giờ trùng 8h và 4h chạy song song thay vì nối tiếp nhau.
+
+        Args:
+            cycles: Danh sách (interval, symbols) cần chạy
+        """
+        pending = []
+        # Một mốc thời gian cho cả lần chạy: next funding, thời lượng và last execution đều suy ra từ đây
+        start_ns = time.time_ns()
+        start_time = start_ns / 1e9
+        started_at = datetime.fromtimestamp(start_time, tz=timezone.utc)
+        # Định dạng một lần, dùng chung cho báo cáo của mọi chu kỳ
+        started_str = started_at.strftime("%Y-%m-%d %H:%M:%S")
+        # Đầu giờ hiện tại (epoch giây)
+        hour_start = start_ns // 3_600_000_000_000 * 3600
+        # premiumIndex trả về toàn bộ thị trường: lấy một lần cho mọi chu kỳ và batch,
+        # pool chỉ chạy phần lọc/biến đổi/ghi MongoDB của từng batch
+        market_data = self.extractor._fetch_premium_index() if cycles else None
+        
+        for interval, symbols in cycles:
+            # Bỏ kết quả cũ: nếu lần chạy này lỗi giữa chừng, verification sẽ kiểm tra toàn bộ
+            self._last_cycle_failed.pop(interval, None)
+            try:
+                self.logger.info(f"Starting {interval} funding extraction for {len(symbols)} symbols")
+                
+                next_funding = hour_start + self._CYCLE_HOURS[interval] * 3600
+                start_info = {
+                    "symbols_count": len(symbols),
+                    "next_funding_time": time.strftime("%Y-%m-%d %H:%M UTC", time.gmtime(next_funding)),
+                    "started_at": started_str,
+                }
+                
+                pending.append(
+                    (interval, symbols, start_info, self._submit_batches(symbols, interval, market_data))
+                )
+                
+            except Exception as e:
+                self._report_funding_error(interval, e, started_str)
+        
+        for interval, symbols, start_info, futures in pending:
+            try:
+                # Execute extraction
+                result = self._collect_batches(symbols, futures)
+                execution_time = (time.time_ns() - start_ns) / 1e9
+                self._last_cycle_failed[interval] = (start_time, set(result["failed_symbols"]))
+                
+                # Một tin nhắn cho cả chu kỳ (bắt đầu + kết quả)
+                self.tele_bot.send_cycle_report(
+                    interval,
+                    start_info,
+                    {
+                        "success_count": result["success_count"],
+                        "total_count": result["total_count"],
+                        "failed_symbols": result["failed_symbols"],
+                        "execution_time": execution_time,
+                    }
+                )
+                
+                if interval == "8h":
+                    self.last_8h_execution = started_at
+                else:
+                    self.last_4h_execution = started_at
+                
+            except Exception as e:
+                self._report_funding_error(interval, e, started_str)
+    
+    def _report_funding_error(self, interval: str, error: Exception, now_str: Optional[str] = None):
+        """Ghi log và gửi cảnh báo khi một chu kỳ funding lỗi"""
+        self.logger.error(f"Error in {interval} funding execution: {error}")
+        self.tele_bot.send_alert(
+            f"{interval.upper()} Funding Extraction Error",
+            f"Failed to execute {interval} funding extraction\\n\\nError: {str(error)}",
+            "ERROR",
+            now_str=now_str
+        )
     
     def _extract_funding_data(self, symbols: List[str], interval: str) -> Dict[str, Any]:
         """Execute funding data extraction for given symbols
@@ -284,48 +349,8 @@ class FundingRateScheduler:
             Dict with extraction results
         """
         try:
-            # Track which symbols succeeded and failed
-            successful_symbols = []
-            failed_symbols = []
-            
-            # Extract data in batches for better error handling
-            batch_size = 20
-            total_batches = (len(symbols) + batch_size - 1) // batch_size
-            
-            for i in range(0, len(symbols), batch_size):
-                batch_symbols = symbols[i:i + batch_size]
-                batch_num = (i // batch_size) + 1
-                
-                self.logger.info(f"Processing batch {batch_num}/{total_batches} ({len(batch_symbols)} symbols)")
-                
-                try:
-                    # Use the extractor's method for this batch
-                    self.extractor._fetch_and_update_funding_rates(batch_symbols, interval)
-                    
-                    # If no exception, consider all batch symbols successful
-                    successful_symbols.extend(batch_symbols)
-                    
-                except Exception as batch_error:
-                    self.logger.error(f"Batch {batch_num} failed: {batch_error}")
-                    failed_symbols.extend(batch_symbols)
-                    
-                    # Small delay between batches
-                    time.sleep(1)
-            
-            success_count = len(successful_symbols)
-            total_count = len(symbols)
-            
-            self.logger.info(f"Extraction completed: {success_count}/{total_count} symbols successful")
-            
-            if failed_symbols:
-                self.logger.warning(f"Failed symbols: {failed_symbols[:5]}")
-            
-            return {
-                "success_count": success_count,
-                "total_count": total_count,
-                "failed_symbols": failed_symbols,
-                "successful_symbols": successful_symbols
-            }
+            market_data = self.extractor._fetch_premium_index()
+            return self._collect_batches(symbols, self._submit_batches(symbols, interval, market_data))
             
         except Exception as e:
             self.logger.error(f"Error extracting funding data: {e}")
@@ -336,6 +361,134 @@ class FundingRateScheduler:
                 "successful_symbols": []
             }
     
+    def _submit_batches(self, symbols: List[str], interval: str,
+                        market_data: Optional[List[Dict[str, Any]]]) -> Dict[Any, Tuple[int, List[str]]]:
+        """Đưa các batch symbol vào pool extraction
+
+        Args:
+            symbols: Danh sách symbol
+            interval: Chu kỳ funding (4h hoặc 8h)
+            market_data: premiumIndex đã lấy cho lần chạy này (None nếu lấy lỗi:
+                không submit batch nào, mọi symbol được tính là lỗi)
+
+        Returns:
+            Dict future -> (số thứ tự batch, symbols của batch)
+        """
+        # Extract data in batches for better error handling
+        batch_size = self.EXTRACT_BATCH_SIZE
+        total_batches = (len(symbols) + batch_size - 1) // batch_size
+        
+        futures = {}
+        if market_data is None:
+            self.logger.error(f"No premiumIndex data, skipping {interval} extraction")
+            return futures
+        
+        # Các batch độc lập nhau (ghi MongoDB) nên chạy song song trên pool
+        for i in range(0, len(symbols), batch_size):
+            batch_symbols = symbols[i:i + batch_size]
+            future = self._extract_pool.submit(
+                self.extractor._update_funding_rates, market_data, batch_symbols, interval
+            )
+            futures[future] = ((i // batch_size) + 1, batch_symbols)
+        
+        self.logger.info(f"Submitted {total_batches} {interval} batches ({len(symbols)} symbols)")
+        return futures
+    
+    def _collect_batches(self, symbols: List[str], futures: Dict[Any, Tuple[int, List[str]]]) -> Dict[str, Any]:
+        """Chờ các batch đã submit và tổng hợp kết quả
+
+        Args:
+            symbols: Toàn bộ symbol của chu kỳ
+            futures: Kết quả của _submit_batches
+
+        Returns:
+            Dict with extraction results
+        """
+        # Track which symbols succeeded (set: cập nhật và tra cứu O(1)); còn lại là lỗi
+        successful = set()
+        total_batches = len(futures)
+        
+        for future in as_completed(futures):
+            batch_num, batch_symbols = futures[future]
+            try:
+                # Extractor trả về tập symbol đã ghi vào MongoDB; symbol còn lại của batch là lỗi
+                # (extractor tự bắt lỗi nên một batch "không raise" chưa chắc đã ghi được)
+                written = future.result() or set()
+                successful.update(symbol for symbol in batch_symbols if symbol in written)
+                
+            except Exception as batch_error:
+                self.logger.error(f"Batch {batch_num}/{total_batches} failed: {batch_error}")
+        
+        # Trả về list theo đúng thứ tự symbol ban đầu (batch hoàn thành không theo thứ tự).
+        # Symbol không thuộc batch nào đã submit (vd. không lấy được premiumIndex) cũng là lỗi
+        successful_symbols = [symbol for symbol in symbols if symbol in successful]
+        failed_symbols = [symbol for symbol in symbols if symbol not in successful]
+        success_count = len(successful_symbols)
+        total_count = len(symbols)
+        
+        self.logger.info(f"Extraction completed: {success_count}/{total_count} symbols successful")
+        
+        if failed_symbols:
+            self.logger.warning(f"Failed symbols: {failed_symbols[:5]}")
+        
+        return {
+            "success_count": success_count,
+            "total_count": total_count,
+            "failed_symbols": failed_symbols,
+            "successful_symbols": successful_symbols
+        }
+    
+    def _queue_verification(self, hour: int):
+        """Đưa verification của giờ này sang luồng verify, trả về ngay cho scheduler
+
+        Args:
+            hour: Giờ funding UTC (0-23)
+        """
+        self._verify_pool.submit(self._verify_funding_at, hour)
+    
+    def _verify_funding_at(self, hour: int):
+        """Kiểm tra dữ liệu mọi chu kỳ đến hạn tại giờ UTC này bằng một truy vấn
+
+        Args:
+            hour: Giờ funding UTC (0-23)
+        """
+        cycles = [
+            (interval, self._symbols_to_verify(interval, symbols), len(symbols))
+            for interval, symbols in self._due_cycles(hour)
+        ]
+        if cycles:
+            self._verify_cycles(cycles)
+    
+    def _symbols_to_verify(self, interval: str, symbols: List[str]) -> List[str]:
+        """Thu hẹp danh sách symbol cần kiểm tra dựa trên kết quả extraction gần nhất
+
+        Extraction báo chính xác symbol nào đã được MongoDB xác nhận ghi, nên symbol
+        lỗi luôn được kiểm tra, còn symbol đã ghi chỉ cần một đại diện mỗi batch.
+
+        Args:
+            interval: Chu kỳ funding (4h hoặc 8h)
+            symbols: Toàn bộ symbol của chu kỳ
+
+        Returns:
+            Danh sách symbol cần kiểm tra
+        """
+        last_cycle = self._last_cycle_failed.get(interval)
+        if last_cycle is None or time.time() - last_cycle[0] > self.max_data_age:
+            # Không có kết quả extraction của chu kỳ này (vừa khởi động, chu kỳ lỗi hoặc bị lỡ)
+            return symbols
+        failed = last_cycle[1]
+        
+        batch_size = self.EXTRACT_BATCH_SIZE
+        selected = [
+            symbol for i, symbol in enumerate(symbols)
+            if i % batch_size == 0 or symbol in failed
+        ]
+        self.logger.info(
+            f"{interval} verification narrowed to {len(selected)}/{len(symbols)} symbols "
+            f"({len(failed)} failed in extraction)"
+        )
+        return selected
+    
     def _verify_8h_data(self):
         """Verify 8h funding data was properly inserted/updated"""
         if not self.symbols_8h:
@@ -352,55 +505,87 @@ class FundingRateScheduler:
     
     def _verify_funding_data(self, symbols: List[str], interval: str):
         """Verify funding data for given symbols and interval"""
+        self._verify_cycles([(interval, symbols, len(symbols))])
+    
+    def _verify_cycles(self, cycles: List[Tuple[str, List[str], int]]):
+        """Kiểm tra dữ liệu cho một hoặc nhiều chu kỳ bằng một lần aggregate
+
+        Args:
+            cycles: Danh sách (interval, symbols cần kiểm tra, tổng số symbol của chu kỳ).
+                Symbol không nằm trong danh sách kiểm tra đã được MongoDB xác nhận ghi
+                nên được tính là verified
+        """
+        intervals = "/".join(interval for interval, _, _ in cycles)
         try:
-            self.logger.info(f"Verifying {interval} funding data for {len(symbols)} symbols")
+            all_symbols = [symbol for _, symbols, _ in cycles for symbol in symbols]
+            self.logger.info(f"Verifying {intervals} funding data for {len(all_symbols)} symbols")
             
             # Use LoadMongo to verify recent data
             verification_result = self.load_mongo.verify_recent_funding_data(
                 "realtime",  # collection name
-                symbols,
+                all_symbols,
                 self.max_data_age
             )
             
-            missing_symbols = verification_result.get("missing_symbols", [])
-            stale_symbols = verification_result.get("stale_symbols", [])
-            success_rate = verification_result.get("success_rate", 0)
-            
             # Combine missing and stale symbols as problematic
-            problematic_symbols = missing_symbols + stale_symbols
-            
-            # Log results
-            self.logger.info(f"{interval} data verification results:")
-            self.logger.info(f"  Success rate: {success_rate:.1%}")
-            self.logger.info(f"  Verified symbols: {verification_result.get('verified_symbols', 0)}/{len(symbols)}")
-            
-            if problematic_symbols:
-                self.logger.warning(f"  Missing symbols: {len(missing_symbols)}")
-                self.logger.warning(f"  Stale symbols: {len(stale_symbols)}")
-                self.logger.warning(f"  Problematic symbols: {problematic_symbols[:5]}")
+            problematic_all = set(verification_result.get("missing_symbols", []))
+            problematic_all.update(verification_result.get("stale_symbols", []))
+        
+        except Exception as e:
+            for interval, _, _ in cycles:
+                self._report_verification_error(interval, e)
+            return
+        
+        # Tách kết quả chung theo từng chu kỳ
+        for interval, symbols, total_count in cycles:
+            try:
+                problematic_symbols = [s for s in symbols if s in problematic_all]
+                verified_count = total_count - len(problematic_symbols)
+                success_rate = verified_count / total_count if total_count else 0
                 
-                # Send verification alert only if there are significant issues
-                # (more than 5% failure rate or more than 5 symbols)
-                if success_rate < 0.95 or len(problematic_symbols) > 5:
-                    self.tele_bot.send_data_verification_alert(
-                        interval,
-                        problematic_symbols,
-                        len(symbols),
-                        verification_result.get("verified_symbols", 0)
-                    )
-                else:
-                    self.logger.info(f"Minor verification issues (< 5%), no alert sent")
-            else:
-                self.logger.info(f"{interval} data verification passed completely")
+                # Log results
+                self.logger.info(f"{interval} data verification results:")
+                self.logger.info(f"  Success rate: {success_rate:.1%}")
+                self.logger.info(f"  Verified symbols: {verified_count}/{total_count} ({len(symbols)} checked)")
                 
-        except Exception as e:
-            self.logger.error(f"Error verifying {interval} funding data: {e}")
-            # Send error alert
-            self.tele_bot.send_alert(
-                f"{interval.upper()} Data Verification Error",
-                f"Failed to verify {interval} funding data\\n\\nError: {str(e)}",
-                "ERROR"
-            )
+                if problematic_symbols:
+                    self.logger.warning(f"  Missing/stale symbols: {len(problematic_symbols)}")
+                    self.logger.warning(f"  Problematic symbols: {problematic_symbols[:5]}")
+                    
+                    # Send verification alert only if there are significant issues
+                    # (more than 5% failure rate or more than 5 symbols)
+                    if success_rate < 0.95 or len(problematic_symbols) > 5:
+                        with self._alert_lock:
+                            self._alert_buffer.append(
+                                (interval, problematic_symbols, total_count, verified_count)
+                            )
+                    else:
+                        self.logger.info(f"Minor verification issues (< 5%), no alert sent")
+                else:
+                    self.logger.info(f"{interval} data verification passed completely")
+                    
+            except Exception as e:
+                self._report_verification_error(interval, e)
+        
+        self._flush_alerts()
+    
+    def _flush_alerts(self):
+        """Gửi toàn bộ cảnh báo verification đang chờ trong một tin nhắn"""
+        with self._alert_lock:
+            alerts, self._alert_buffer = self._alert_buffer, []
+        
+        if alerts:
+            self.tele_bot.send_data_verification_alerts(alerts)
+    
+    def _report_verification_error(self, interval: str, error: Exception):
+        """Ghi log và gửi cảnh báo khi kiểm tra dữ liệu lỗi"""
+        self.logger.error(f"Error verifying {interval} funding data: {error}")
+        # Send error alert
+        self.tele_bot.send_alert(
+            f"{interval.upper()} Data Verification Error",
+            f"Failed to verify {interval} funding data\\n\\nError: {str(error)}",
+            "ERROR"
+        )
     
     def get_status(self) -> Dict[str, Any]:
         """Get scheduler status"""
@@ -411,5 +596,5 @@ class FundingRateScheduler:
             "symbols_4h": len(self.symbols_4h),
             "last_8h_execution": self.last_8h_execution.isoformat() if self.last_8h_execution else None,
             "last_4h_execution": self.last_4h_execution.isoformat() if self.last_4h_execution else None,
-            "scheduled_jobs": len(schedule.jobs)
+            "scheduled_jobs": len(self.scheduler.jobs)
         }
\ No newline at end of file
@@ -1,7 +1,12 @@
 import pytz
+import time
 from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Union
 
+# pytz.timezone tra cứu database tz mỗi lần gọi; tz dùng lại nên cache theo tên
+_get_timezone = lru_cache(maxsize=64)(pytz.timezone)
+
 
 class UtilConvertDatetime:
     """Lớp tiện ích để chuyển đổi datetime"""
@@ -26,7 +31,7 @@ class UtilConvertDatetime:
         dt = datetime.fromtimestamp(timestamp, tz=timezone.utc)
 
         if tz != "UTC":
-            target_tz = pytz.timezone(tz)
+            target_tz = _get_timezone(tz)
             dt = dt.astimezone(target_tz)
 
         return dt
@@ -46,7 +51,7 @@ class UtilConvertDatetime:
     @staticmethod
     def get_current_timestamp() -> int:
         """Lấy timestamp hiện tại tính bằng milliseconds"""
-        return int(datetime.now(timezone.utc).timestamp() * 1000)
+        return time.time_ns() // 1_000_000
 
     @staticmethod
     def format_datetime(dt: datetime, format_str: str = "%Y-%m-%d %H:%M:%S") -> str:
@@ -1,12 +1,177 @@
-import requests
+import atexit
+import functools
+import heapq
+import itertools
+import random
+import threading
 import time
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 from src.config.config_variable import TELE_CONFIG
 from src.config.config_logging import ConfigLogging
 
+if TYPE_CHECKING:
+    import requests
+
+# Session HTTP dùng chung cho mọi instance UtilTeleBotCheck (giữ kết nối keep-alive/TLS).
+# Hai pool riêng: "send" cho sendMessage, "admin" cho getMe/health check, để một
+# health check bị treo không chiếm kết nối của cảnh báo
+_SESSIONS = {}
+_SESSION_LOCK = threading.Lock()
+_POOL_SIZES = {
+    "send": (2, 16),  # (pool_connections, pool_maxsize)
+    "admin": (1, 2),
+}
+
+
+def _get_session(kind: str = "send") -> "requests.Session":
+    """Lấy session HTTP dùng chung theo loại, tạo mới ở lần gọi đầu tiên
+
+    requests chỉ được import ở đây (lần đầu cần gửi), không import khi Telegram tắt
+
+    Args:
+        kind: "send" cho sendMessage, "admin" cho getMe
+
+    Returns:
+        Đối tượng requests.Session
+    """
+    session = _SESSIONS.get(kind)
+    if session is None:
+        with _SESSION_LOCK:
+            session = _SESSIONS.get(kind)
+            if session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+
+                session = requests.Session()
+                # Retry lỗi kết nối cho GET (getMe); sendMessage tự retry trong send_message
+                # để đọc được retry_after của Telegram và cập nhật token bucket
+                retry = Retry(
+                    total=2,
+                    read=0,
+                    status=0,
+                    backoff_factor=0.3,
+                    allowed_methods=frozenset(["GET"]),
+                )
+                pool_connections, pool_maxsize = _POOL_SIZES[kind]
+                adapter = HTTPAdapter(
+                    pool_connections=pool_connections,
+                    pool_maxsize=pool_maxsize,
+                    pool_block=False,
+                    max_retries=retry,
+                )
+                session.mount("https://", adapter)
+                atexit.register(session.close)
+                _SESSIONS[kind] = session
+    return session
+
+
+# Emoji theo mức cảnh báo, dựng một lần thay vì mỗi lần gửi
+_EMOJI_MAP = {
+    "INFO": "ℹ️",
+    "WARNING": "⚠️",
+    "ERROR": "❌",
+    "SUCCESS": "✅",
+}
+
+# Định dạng giá trị trạng thái theo đúng kiểu (type(True) là bool nên không lẫn với int);
+# kiểu khác dùng str
+_STATUS_FORMATTERS = {
+    bool: lambda v: "Yes" if v else "No",
+    int: "{:,}".format,
+    float: "{:,}".format,
+}
+
+
+@functools.lru_cache(maxsize=256)
+def _pretty_key(key: str) -> str:
+    """Định dạng key trạng thái để hiển thị (status dict dùng lại cùng key mỗi chu kỳ)"""
+    return key.replace("_", " ").title()
+
+
+def _preview_symbols(symbols: list, limit: int = 5) -> str:
+    """Hiển thị tối đa `limit` symbol, phần còn lại gộp thành (+N more)"""
+    preview = ", ".join(symbols[:limit])
+    if len(symbols) > limit:
+        preview += f" (+{len(symbols) - limit} more)"
+    return preview
+
 
 class UtilTeleBotCheck:
-    """Lớp tiện ích cho thông báo Telegram bot"""
+    """Lớp tiện ích cho thông báo Telegram bot
+
+    Mức ưu tiên (PRIORITY_*) quyết định cách gửi: tin PRIORITY_HIGH trở lên bỏ qua
+    min_interval và chờ token thay vì bị bỏ; tin NORMAL/LOW bị bỏ nếu vừa gửi tin khác.
+    Mọi mức đều tuân thủ token bucket (giới hạn của Telegram), ưu tiên chỉ đổi thứ tự
+    trong hàng đợi gửi nền. Tham số force=True cũ tương đương priority=PRIORITY_CRITICAL.
+    """
+
+    # Mẫu tin nhắn cảnh báo, tạo một lần cho cả class
+    _ALERT_TEMPLATE = "{emoji} <b>{title}</b>\n\n{message}"
+    _ALERT_TIME_TEMPLATE = "\n\nTime: {time} UTC"
+    _CYCLE_START_TEMPLATE = (
+        "{emoji} <b>Funding Cycle {cycle} Started</b>\n\n"
+        "• <b>Cycle Type:</b> {cycle_type} intervals\n"
+        "• <b>Symbols Count:</b> {symbols_count:,}\n"
+        "{next_funding}"
+        "• <b>Started At:</b> {started_at} UTC"
+    )
+    _CYCLE_RESULT_TEMPLATE = (
+        "{emoji} <b>Funding {cycle} Update {status}</b>\n\n"
+        "• <b>Cycle:</b> {cycle_type} intervals\n"
+        "• <b>Success:</b> {success_count}/{total_count} symbols"
+        "{duration}{failed}"
+    )
+    _VERIFICATION_TEMPLATE = (
+        "❌ <b>Data Verification Failed - {cycle} Cycle</b>\n\n"
+        "• <b>Cycle:</b> {cycle_type} intervals\n"
+        "• <b>Expected Updates:</b> {expected_count}\n"
+        "• <b>Actual Updates:</b> {actual_count}\n"
+        "• <b>Missing Count:</b> {missing_count}"
+        "{missing}"
+    )
+    # level -> (emoji, trạng thái) cho phần kết quả chu kỳ
+    _RESULT_STATUS = {
+        "SUCCESS": ("✅", "Completed"),
+        "WARNING": ("⚠️", "Partial"),
+        "ERROR": ("❌", "Failed"),
+    }
+
+    # Mức ưu tiên trong hàng đợi gửi nền (số nhỏ gửi trước)
+    PRIORITY_CRITICAL = 0
+    PRIORITY_HIGH = 1
+    PRIORITY_NORMAL = 2
+    PRIORITY_LOW = 3
+    _LEVEL_PRIORITY = {"ERROR": PRIORITY_CRITICAL, "WARNING": PRIORITY_HIGH}
+
+    # Hàng đợi ưu tiên gửi nền dùng chung cho mọi instance (cùng bot, cùng chat):
+    # heap các entry [priority, seq, dedup_key, bot, message]
+    _OUTBOX_MAXSIZE = 256
+    _outbox_heap = []
+    _outbox_pending = {}  # dedup_key -> entry đang chờ, tin mới thay nội dung tin cũ
+    _outbox_seq = itertools.count()
+    _outbox_unfinished = 0
+    _outbox_cond = threading.Condition()
+    _outbox_thread = None
+    _outbox_lock = threading.Lock()
+
+    # Token bucket thích ứng dùng chung: giới hạn của Telegram tính theo bot/chat, không theo instance
+    # (tối đa ~20 tin/phút cho group). Gặp 429 thì giảm nửa tốc độ, gửi thành công thì tăng dần lại
+    _BUCKET_CAPACITY = 5.0
+    _MAX_RATE = 20 / 60  # token/giây
+    _MIN_RATE = 1 / 60
+    _RATE_STEP = 0.01
+    _FORCE_MAX_WAIT = 30  # giây tối đa chờ token với tin PRIORITY_HIGH trở lên
+    _bucket_lock = threading.Lock()
+    _tokens = _BUCKET_CAPACITY
+    _rate = _MAX_RATE
+    _last_refill = time.monotonic()
+    _retry_at = 0.0
+
+    # Retry sendMessage: backoff lũy thừa có jitter, hoặc đúng retry_after khi Telegram yêu cầu
+    _MAX_SEND_ATTEMPTS = 5
+    _BACKOFF_BASE = 0.5
+    _BACKOFF_CAP = 30
 
     def __init__(self):
         self.logger = ConfigLogging.config_logging("UtilTeleBotCheck")
@@ -14,15 +179,26 @@ class UtilTeleBotCheck:
         self.chat_id = TELE_CONFIG.get("tele_chat_id")
         self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
         self.parse_mode = TELE_CONFIG.get("tele_message_parse", "HTML")
+        # URL và tham số cố định, dựng một lần; mỗi tin nhắn chỉ thêm "text"
+        self._send_url = f"{self.base_url}/sendMessage"
+        self._getme_url = f"{self.base_url}/getMe"
+        self._base_params = {"chat_id": self.chat_id, "parse_mode": self.parse_mode}
         self.last_sent_time = 0
         self.min_interval = TELE_CONFIG.get("tele_check_interval_second", 30)
-
-    def send_message(self, message: str, force: bool = False) -> bool:
+        self._ts_cache = (0, "")  # (giây epoch, chuỗi thời gian UTC đã định dạng)
+        # Chỉ import requests khi bot được cấu hình, tránh chi phí import khi tắt Telegram
+        self._requests = None
+        if self.bot_token and self.chat_id:
+            import requests
+            self._requests = requests
+
+    def send_message(self, message: str, priority: int = PRIORITY_NORMAL, force: bool = False) -> bool:
         """Gửi tin nhắn tới chat Telegram
 
         Args:
             message: Văn bản tin nhắn để gửi
-            force: Buộc gửi mà không giới hạn tốc độ
+            priority: Mức ưu tiên (PRIORITY_*); PRIORITY_HIGH trở lên bỏ qua min_interval
+            force: Tương thích ngược, tương đương priority=PRIORITY_CRITICAL
 
         Returns:
             True nếu gửi thành công, False nếu không
@@ -33,63 +209,265 @@ class UtilTeleBotCheck:
                 self.logger.warning("Telegram bot not configured")
                 return False
 
-            # Giới hạn tốc độ (trừ khi buộc)
+            if force:
+                priority = self.PRIORITY_CRITICAL
+            urgent = priority <= self.PRIORITY_HIGH
+
+            # Giới hạn tốc độ (trừ tin ưu tiên cao)
             current_time = time.time()
-            if not force and (current_time - self.last_sent_time) < self.min_interval:
+            if not urgent and (current_time - self.last_sent_time) < self.min_interval:
                 self.logger.debug("Rate limiting: message not sent")
                 return False
 
+            # Tin ưu tiên cao chỉ bỏ qua min_interval; vẫn phải tuân thủ giới hạn của Telegram (chờ token)
+            if not self._acquire_token(wait=urgent):
+                self.logger.warning("Telegram rate limit reached: message not sent")
+                return False
+
             # Chuẩn bị request
-            url = f"{self.base_url}/sendMessage"
-            params = {
-                "chat_id": self.chat_id,
-                "text": message,
-                "parse_mode": self.parse_mode,
-            }
-
-            # Gửi request
-            response = requests.post(url, data=params, timeout=10)
-            response.raise_for_status()
-
-            self.last_sent_time = current_time
-            self.logger.debug("Telegram message sent successfully")
-            return True
-
-        except requests.exceptions.RequestException as e:
+            url = self._send_url
+            params = {**self._base_params, "text": message}
+
+            # Gửi request, retry lỗi tạm thời thay vì bỏ mất tin nhắn
+            session = _get_session()
+            for attempt in range(self._MAX_SEND_ATTEMPTS):
+                try:
+                    response = session.post(url, data=params, timeout=10)
+                except self._requests.exceptions.ConnectionError as e:
+                    # Chưa kết nối được (kể cả connect timeout) nên gửi lại không gây trùng tin.
+                    # Read timeout không retry: Telegram có thể đã nhận tin
+                    error = e
+                    backoff = self._jitter_backoff(attempt)
+                else:
+                    if response.status_code == 429:
+                        error = "HTTP 429 Too Many Requests"
+                        backoff = self._extract_retry_after_seconds(response)
+                        self._on_rate_limited(backoff)
+                    elif 500 <= response.status_code < 600:
+                        error = f"HTTP {response.status_code}"
+                        backoff = self._jitter_backoff(attempt)
+                    elif response.status_code >= 400:
+                        # 4xx khác (chat_id sai, HTML không hợp lệ...) gửi lại cũng không qua
+                        self.logger.error(
+                            f"Telegram rejected message: HTTP {response.status_code} {response.text[:200]}"
+                        )
+                        return False
+                    else:
+                        self._on_sent()
+                        self.last_sent_time = current_time
+                        self.logger.debug("Telegram message sent successfully")
+                        return True
+
+                if attempt + 1 == self._MAX_SEND_ATTEMPTS:
+                    break
+                self.logger.warning(
+                    f"Telegram send failed ({error}), retry {attempt + 1}/{self._MAX_SEND_ATTEMPTS - 1} "
+                    f"backoff_seconds={backoff:.2f}"
+                )
+                time.sleep(backoff)
+
+            self.logger.error(
+                f"Error sending Telegram message after {self._MAX_SEND_ATTEMPTS} attempts: {error}"
+            )
+            return False
+
+        except self._requests.exceptions.RequestException as e:
             self.logger.error(f"Error sending Telegram message: {e}")
             return False
         except Exception as e:
             self.logger.error(f"Unexpected error sending Telegram message: {e}")
             return False
 
-    def send_alert(self, title: str, message: str, level: str = "INFO") -> bool:
+    @classmethod
+    def _acquire_token(cls, wait: bool) -> bool:
+        """Lấy một token từ bucket dùng chung
+
+        Args:
+            wait: Chờ tới khi có token (tối đa _FORCE_MAX_WAIT giây) thay vì trả về ngay
+
+        Returns:
+            True nếu lấy được token, False nếu không
+        """
+        deadline = time.monotonic() + cls._FORCE_MAX_WAIT
+        while True:
+            with cls._bucket_lock:
+                now = time.monotonic()
+                cls._tokens = min(
+                    cls._BUCKET_CAPACITY, cls._tokens + (now - cls._last_refill) * cls._rate
+                )
+                cls._last_refill = now
+                if now >= cls._retry_at and cls._tokens >= 1:
+                    cls._tokens -= 1
+                    return True
+                delay = max(cls._retry_at - now, (1 - cls._tokens) / cls._rate)
+
+            if not wait or now + delay > deadline:
+                return False
+            time.sleep(delay)
+
+    @classmethod
+    def _on_rate_limited(cls, retry_after: float):
+        """Telegram trả 429: chặn gửi tới hết retry_after và giảm nửa tốc độ"""
+        with cls._bucket_lock:
+            cls._retry_at = max(cls._retry_at, time.monotonic() + retry_after)
+            cls._rate = max(cls._MIN_RATE, cls._rate * 0.5)
+            cls._tokens = 0.0
+
+    @classmethod
+    def _on_sent(cls):
+        """Gửi thành công: tăng dần tốc độ trở lại mức tối đa"""
+        with cls._bucket_lock:
+            cls._rate = min(cls._MAX_RATE, cls._rate + cls._RATE_STEP)
+
+    @classmethod
+    def _jitter_backoff(cls, attempt: int) -> float:
+        """Thời gian chờ full-jitter cho lần retry thứ attempt (tính từ 0)"""
+        return random.uniform(0, min(cls._BACKOFF_CAP, cls._BACKOFF_BASE * 2 ** attempt))
+
+    @staticmethod
+    def _extract_retry_after_seconds(response) -> float:
+        """Đọc thời gian chờ từ response 429 của Telegram
+
+        Args:
+            response: Response HTTP từ Telegram
+
+        Returns:
+            Số giây cần chờ (mặc định 1 nếu không đọc được)
+        """
+        try:
+            return float(response.json()["parameters"]["retry_after"])
+        except Exception:
+            pass
+        try:
+            return float(response.headers.get("Retry-After", 1))
+        except (TypeError, ValueError):
+            return 1.0
+
+    def _now_str(self) -> str:
+        """Thời gian UTC hiện tại dạng chuỗi, chỉ định dạng lại khi sang giây mới
+
+        Returns:
+            Chuỗi "%Y-%m-%d %H:%M:%S" theo UTC
+        """
+        now = int(time.time())
+        cached_second, cached_str = self._ts_cache
+        if now != cached_second:
+            # gmtime: giờ UTC, không tra cứu timezone local
+            cached_str = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(now))
+            self._ts_cache = (now, cached_str)
+        return cached_str
+
+    def send_message_nowait(self, message: str, priority: int = PRIORITY_NORMAL,
+                            dedup_key=None, force: bool = False) -> bool:
+        """Đưa tin nhắn vào hàng đợi gửi nền và trả về ngay, không chờ Telegram
+
+        Args:
+            message: Văn bản tin nhắn để gửi
+            priority: Mức ưu tiên (PRIORITY_*), số nhỏ gửi trước
+            dedup_key: Khóa gộp; tin đang chờ cùng khóa được thay bằng tin mới
+            force: Tương thích ngược, tương đương priority=PRIORITY_CRITICAL
+
+        Returns:
+            True nếu đã đưa vào hàng đợi, False nếu không
+        """
+        if not self.bot_token or not self.chat_id:
+            self.logger.warning("Telegram bot not configured")
+            return False
+
+        if force:
+            priority = self.PRIORITY_CRITICAL
+
+        self._start_outbox()
+        cls = type(self)
+        with cls._outbox_cond:
+            pending = cls._outbox_pending.get(dedup_key) if dedup_key is not None else None
+            if pending is not None:
+                # Giữ vị trí trong hàng đợi, chỉ cập nhật nội dung mới nhất
+                pending[3:] = [self, message]
+                return True
+
+            if len(cls._outbox_heap) >= cls._OUTBOX_MAXSIZE:
+                self.logger.warning("Telegram outbox full, dropping message")
+                return False
+
+            entry = [priority, next(cls._outbox_seq), dedup_key, self, message]
+            heapq.heappush(cls._outbox_heap, entry)
+            if dedup_key is not None:
+                cls._outbox_pending[dedup_key] = entry
+            cls._outbox_unfinished += 1
+            cls._outbox_cond.notify_all()
+        return True
+
+    @classmethod
+    def _start_outbox(cls):
+        """Khởi động luồng gửi nền dùng chung nếu chưa chạy"""
+        if cls._outbox_thread is not None and cls._outbox_thread.is_alive():
+            return
+        with cls._outbox_lock:
+            if cls._outbox_thread is not None and cls._outbox_thread.is_alive():
+                return
+            if cls._outbox_thread is None:
+                # Gửi nốt tin nhắn còn trong hàng đợi khi process thoát
+                atexit.register(cls._drain_outbox)
+            cls._outbox_thread = threading.Thread(
+                target=cls._outbox_worker, name="tele-outbox", daemon=True
+            )
+            cls._outbox_thread.start()
+
+    @classmethod
+    def _outbox_worker(cls):
+        """Lấy tin nhắn ưu tiên cao nhất (cũ nhất trong cùng mức) và gửi qua Telegram"""
+        while True:
+            with cls._outbox_cond:
+                while not cls._outbox_heap:
+                    cls._outbox_cond.wait()
+                entry = heapq.heappop(cls._outbox_heap)
+                if entry[2] is not None:
+                    cls._outbox_pending.pop(entry[2], None)
+
+            priority, _, _, bot, message = entry
+            try:
+                bot.send_message(message, priority=priority)
+            except Exception as e:
+                bot.logger.error(f"Error sending queued Telegram message: {e}")
+            finally:
+                with cls._outbox_cond:
+                    cls._outbox_unfinished -= 1
+                    cls._outbox_cond.notify_all()
+
+    @classmethod
+    def _drain_outbox(cls, timeout: float = 10):
+        """Chờ hàng đợi gửi nền rỗng (tối đa timeout giây)"""
+        with cls._outbox_cond:
+            cls._outbox_cond.wait_for(lambda: cls._outbox_unfinished == 0, timeout=timeout)
+
+    def send_alert(self, title: str, message: str, level: str = "INFO",
+                   now_str: Optional[str] = None) -> bool:
         """Gửi tin nhắn cảnh báo đã định dạng
 
         Args:
             title: Tiêu đề cảnh báo
             message: Tin nhắn cảnh báo
             level: Mức độ cảnh báo (INFO, WARNING, ERROR)
+            now_str: Thời gian UTC đã định dạng sẵn (mặc định: thời điểm gọi)
 
         Returns:
-            True nếu gửi thành công, False nếu không
+            True nếu đã đưa vào hàng đợi gửi, False nếu không
         """
         try:
             # Định dạng tin nhắn với emoji dựa trên mức độ
-            emoji_map = {
-                "INFO": "ℹ️",
-                "WARNING": "⚠️",
-                "ERROR": "❌",
-                "SUCCESS": "✅",
-            }
-
-            emoji = emoji_map.get(level.upper(), "📢")
+            level = level.upper()
+            formatted_message = self._ALERT_TEMPLATE.format(
+                emoji=_EMOJI_MAP.get(level, "📢"), title=title, message=message
+            )
 
-            formatted_message = f"{emoji} <b>{title}</b>\n\n{message}"
+            if level in ("WARNING", "ERROR"):
+                formatted_message += self._ALERT_TIME_TEMPLATE.format(time=now_str or self._now_str())
 
-            if level.upper() in ["WARNING", "ERROR"]:
-                formatted_message += f"\n\nTime: {time.strftime('%Y-%m-%d %H:%M:%S')}"
-
-            return self.send_message(formatted_message, force=True)
+            return self.send_message_nowait(
+                formatted_message,
+                priority=self._LEVEL_PRIORITY.get(level, self.PRIORITY_HIGH),
+            )
 
         except Exception as e:
             self.logger.error(f"Error sending alert: {e}")
@@ -105,19 +483,22 @@ class UtilTeleBotCheck:
             True nếu gửi thành công, False nếu không
         """
         try:
-            message = "<b>System Status Update</b>\n\n"
+            parts = ["<b>System Status Update</b>\n\n"]
 
             for key, value in status_data.items():
-                if isinstance(value, bool):
-                    value = "Yes" if value else "No"
-                elif isinstance(value, (int, float)):
-                    value = f"{value:,}"
+                value = _STATUS_FORMATTERS.get(type(value), str)(value)
 
                 # Định dạng key để hiển thị
-                display_key = key.replace("_", " ").title()
-                message += f"• <b>{display_key}:</b> {value}\n"
+                parts.append(f"• <b>{_pretty_key(key)}:</b> {value}\n")
+
+            message = "".join(parts)
 
-            return self.send_message(message)
+            # Cập nhật trạng thái mới thay cho bản cũ còn chờ gửi với cùng các key
+            return self.send_message_nowait(
+                message,
+                priority=self.PRIORITY_LOW,
+                dedup_key=("status", frozenset(status_data)),
+            )
 
         except Exception as e:
             self.logger.error(f"Error sending status update: {e}")
@@ -133,10 +514,14 @@ class UtilTeleBotCheck:
             if not self.bot_token:
                 self.logger.error("Bot token not configured")
                 return False
+            if self._requests is None:
+                self.logger.error("Telegram bot not configured")
+                return False
 
-            url = f"{self.base_url}/getMe"
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
+            response = _get_session("admin").get(self._getme_url, timeout=10)
+            if response.status_code >= 400:
+                self.logger.error(f"Bot connection failed: HTTP {response.status_code}")
+                return False
 
             data = response.json()
             if data.get("ok"):
@@ -153,38 +538,32 @@ class UtilTeleBotCheck:
             self.logger.error(f"Error testing bot connection: {e}")
             return False
 
-    def send_funding_cycle_start(self, cycle_type: str, symbols_count: int, next_funding_time: str = None) -> bool:
+    def send_funding_cycle_start(self, cycle_type: str, symbols_count: int, next_funding_time: str = None,
+                                 now_str: Optional[str] = None) -> bool:
         """Send funding cycle start notification
         
         Args:
             cycle_type: "4h" or "8h"
             symbols_count: Number of symbols in this cycle
             next_funding_time: Optional next funding time
+            now_str: Optional pre-formatted UTC start time (defaults to now)
             
         Returns:
             True if sent successfully, False otherwise
         """
         try:
-            emoji = "🔄" if cycle_type == "8h" else "⚡"
-            title = f"Funding Cycle {cycle_type.upper()} Started"
-            
-            message = f"{emoji} <b>{title}</b>\n\n"
-            message += f"• <b>Cycle Type:</b> {cycle_type} intervals\n"
-            message += f"• <b>Symbols Count:</b> {symbols_count:,}\n"
-            
-            if next_funding_time:
-                message += f"• <b>Next Funding:</b> {next_funding_time}\n"
-                
-            message += f"• <b>Started At:</b> {time.strftime('%Y-%m-%d %H:%M:%S')} UTC"
-            
-            return self.send_message(message)
+            message = self._format_cycle_start(
+                cycle_type, symbols_count, next_funding_time, now_str or self._now_str()
+            )
+            return self.send_message_nowait(message)
             
         except Exception as e:
             self.logger.error(f"Error sending funding cycle start notification: {e}")
             return False
 
     def send_funding_update_result(self, cycle_type: str, success_count: int, total_count: int, 
-                                 failed_symbols: list = None, execution_time: float = None) -> bool:
+                                 failed_symbols: list = None, execution_time: float = None,
+                                 now_str: Optional[str] = None) -> bool:
         """Send funding update result notification
         
         Args:
@@ -193,43 +572,20 @@ class UtilTeleBotCheck:
             total_count: Total number of symbols processed
             failed_symbols: List of symbols that failed to update
             execution_time: Time taken for the update
+            now_str: Optional pre-formatted UTC time (defaults to now)
             
         Returns:
             True if sent successfully, False otherwise
         """
         try:
-            # Determine status
-            if success_count == total_count:
-                emoji = "✅"
-                level = "SUCCESS"
-                title = f"Funding {cycle_type.upper()} Update Completed"
-            elif success_count > 0:
-                emoji = "⚠️"
-                level = "WARNING" 
-                title = f"Funding {cycle_type.upper()} Update Partial"
-            else:
-                emoji = "❌"
-                level = "ERROR"
-                title = f"Funding {cycle_type.upper()} Update Failed"
-            
-            message = f"{emoji} <b>{title}</b>\n\n"
-            message += f"• <b>Cycle:</b> {cycle_type} intervals\n"
-            message += f"• <b>Success:</b> {success_count}/{total_count} symbols\n"
-            
-            if execution_time:
-                message += f"• <b>Duration:</b> {execution_time:.2f}s\n"
-            
-            if failed_symbols:
-                message += f"• <b>Failed Symbols:</b> {', '.join(failed_symbols[:5])}"
-                if len(failed_symbols) > 5:
-                    message += f" (+{len(failed_symbols) - 5} more)"
-                message += "\n"
-            
-            message += f"• <b>Time:</b> {time.strftime('%Y-%m-%d %H:%M:%S')} UTC"
+            level, message = self._format_cycle_result(
+                cycle_type, success_count, total_count, failed_symbols, execution_time
+            )
+            message += f"\n• <b>Time:</b> {now_str or self._now_str()} UTC"
             
             # Only send if there are issues or force sending for success
             if level in ["WARNING", "ERROR"] or (level == "SUCCESS" and total_count > 50):
-                return self.send_message(message, force=True)
+                return self.send_message_nowait(message, priority=self.PRIORITY_HIGH)
             else:
                 self.logger.debug(f"Funding update completed successfully, no notification needed")
                 return True
@@ -238,8 +594,100 @@ class UtilTeleBotCheck:
             self.logger.error(f"Error sending funding update result: {e}")
             return False
 
+    def send_cycle_report(self, cycle_type: str, start_info: dict, result_info: dict,
+                          verification_info: Optional[tuple] = None) -> bool:
+        """Gửi báo cáo của cả một chu kỳ funding trong một tin nhắn
+
+        Gộp phần bắt đầu, kết quả và (nếu có) kiểm tra dữ liệu thay vì gửi
+        ba tin nhắn riêng, giảm số request tới Telegram mỗi chu kỳ.
+
+        Args:
+            cycle_type: "4h" hoặc "8h"
+            start_info: Dict với symbols_count, next_funding_time, started_at
+            result_info: Dict với success_count, total_count, failed_symbols, execution_time
+            verification_info: (missing_symbols, expected_count, actual_count) hoặc None
+
+        Returns:
+            True nếu gửi thành công, False nếu không
+        """
+        try:
+            sections = [
+                self._format_cycle_start(
+                    cycle_type,
+                    start_info["symbols_count"],
+                    start_info.get("next_funding_time"),
+                    start_info.get("started_at") or self._now_str(),
+                ),
+            ]
+            level, result_section = self._format_cycle_result(
+                cycle_type,
+                result_info["success_count"],
+                result_info["total_count"],
+                result_info.get("failed_symbols"),
+                result_info.get("execution_time"),
+            )
+            sections.append(result_section)
+            
+            priority = self.PRIORITY_CRITICAL if level == "ERROR" else self.PRIORITY_HIGH
+            if verification_info is not None:
+                sections.append(self._format_data_verification_alert(cycle_type, *verification_info))
+                priority = self.PRIORITY_CRITICAL
+            
+            message = "\n\n".join(sections) + f"\n• <b>Time:</b> {self._now_str()} UTC"
+            return self.send_message_nowait(message, priority=priority)
+            
+        except Exception as e:
+            self.logger.error(f"Error sending funding cycle report: {e}")
+            return False
+
+    @classmethod
+    def _format_cycle_start(cls, cycle_type: str, symbols_count: int,
+                            next_funding_time: Optional[str], started_at: str) -> str:
+        """Định dạng phần bắt đầu chu kỳ funding
+
+        Returns:
+            Chuỗi HTML của phần bắt đầu
+        """
+        return cls._CYCLE_START_TEMPLATE.format_map({
+            "emoji": "🔄" if cycle_type == "8h" else "⚡",
+            "cycle": cycle_type.upper(),
+            "cycle_type": cycle_type,
+            "symbols_count": symbols_count,
+            "next_funding": f"• <b>Next Funding:</b> {next_funding_time}\n" if next_funding_time else "",
+            "started_at": started_at,
+        })
+
+    @classmethod
+    def _format_cycle_result(cls, cycle_type: str, success_count: int, total_count: int,
+                             failed_symbols: Optional[list], execution_time: Optional[float]) -> tuple:
+        """Định dạng phần kết quả chu kỳ funding
+
+        Returns:
+            (level, chuỗi HTML) với level là SUCCESS, WARNING hoặc ERROR
+        """
+        # Determine status
+        if success_count == total_count:
+            level = "SUCCESS"
+        elif success_count > 0:
+            level = "WARNING"
+        else:
+            level = "ERROR"
+        emoji, status = cls._RESULT_STATUS[level]
+        
+        return level, cls._CYCLE_RESULT_TEMPLATE.format_map({
+            "emoji": emoji,
+            "cycle": cycle_type.upper(),
+            "status": status,
+            "cycle_type": cycle_type,
+            "success_count": success_count,
+            "total_count": total_count,
+            "duration": f"\n• <b>Duration:</b> {execution_time:.2f}s" if execution_time else "",
+            "failed": f"\n• <b>Failed Symbols:</b> {_preview_symbols(failed_symbols)}" if failed_symbols else "",
+        })
+
     def send_data_verification_alert(self, cycle_type: str, missing_symbols: list, 
-                                   expected_count: int, actual_count: int) -> bool:
+                                   expected_count: int, actual_count: int,
+                                   now_str: Optional[str] = None) -> bool:
         """Send alert when data verification fails
         
         Args:
@@ -247,30 +695,55 @@ class UtilTeleBotCheck:
             missing_symbols: List of symbols with missing/stale data
             expected_count: Expected number of updated symbols
             actual_count: Actual number of updated symbols
+            now_str: Optional pre-formatted UTC alert time (defaults to now)
             
         Returns:
             True if sent successfully, False otherwise
         """
+        return self.send_data_verification_alerts(
+            [(cycle_type, missing_symbols, expected_count, actual_count)], now_str
+        )
+
+    def send_data_verification_alerts(self, alerts: list, now_str: Optional[str] = None) -> bool:
+        """Gửi cảnh báo kiểm tra dữ liệu của nhiều chu kỳ trong một tin nhắn
+
+        Args:
+            alerts: Danh sách (cycle_type, missing_symbols, expected_count, actual_count)
+            now_str: Thời gian UTC đã định dạng sẵn (mặc định: thời điểm gọi)
+
+        Returns:
+            True nếu gửi thành công, False nếu không
+        """
         try:
-            title = f"Data Verification Failed - {cycle_type.upper()} Cycle"
-            
-            message = f"❌ <b>{title}</b>\n\n"
-            message += f"• <b>Cycle:</b> {cycle_type} intervals\n"
-            message += f"• <b>Expected Updates:</b> {expected_count}\n"
-            message += f"• <b>Actual Updates:</b> {actual_count}\n"
-            message += f"• <b>Missing Count:</b> {len(missing_symbols)}\n"
-            
-            if missing_symbols:
-                message += f"• <b>Missing Symbols:</b> {', '.join(missing_symbols[:5])}"
-                if len(missing_symbols) > 5:
-                    message += f" (+{len(missing_symbols) - 5} more)"
-                message += "\n"
-            
-            message += f"• <b>Alert Time:</b> {time.strftime('%Y-%m-%d %H:%M:%S')} UTC"
-            message += f"\n\n⚠️ <i>Please check the funding rate extraction system</i>"
+            if not alerts:
+                return True
+
+            sections = [self._format_data_verification_alert(*alert) for alert in alerts]
+            message = "".join((
+                "\n\n".join(sections),
+                f"\n• <b>Alert Time:</b> {now_str or self._now_str()} UTC",
+                "\n\n⚠️ <i>Please check the funding rate extraction system</i>",
+            ))
             
-            return self.send_message(message, force=True)
+            return self.send_message_nowait(message, priority=self.PRIORITY_CRITICAL)
             
         except Exception as e:
             self.logger.error(f"Error sending data verification alert: {e}")
             return False
+
+    @classmethod
+    def _format_data_verification_alert(cls, cycle_type: str, missing_symbols: list,
+                                        expected_count: int, actual_count: int) -> str:
+        """Định dạng phần cảnh báo kiểm tra dữ liệu của một chu kỳ
+
+        Returns:
+            Chuỗi HTML của phần cảnh báo
+        """
+        return cls._VERIFICATION_TEMPLATE.format_map({
+            "cycle": cycle_type.upper(),
+            "cycle_type": cycle_type,
+            "expected_count": expected_count,
+            "actual_count": actual_count,
+            "missing_count": len(missing_symbols),
+            "missing": f"\n• <b>Missing Symbols:</b> {_preview_symbols(missing_symbols)}" if missing_symbols else "",
+        })
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Test script kiểm tra mọi file .py trong src/ và scheduler/ đều compile được
+Chặn việc đưa lại file lỗi cú pháp (vd. bản funding_rate_manager_corrupted.py đã xóa)
+"""
+
+import py_compile
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+SOURCE_DIRS = ("src", "scheduler")
+
+
+def test_sources_compile():
+    """Compile từng file nguồn (không import nên không cần pymongo/pandas/requests)"""
+    failures = []
+    checked = 0
+
+    for source_dir in SOURCE_DIRS:
+        for path in sorted((PROJECT_ROOT / source_dir).rglob("*.py")):
+            checked += 1
+            try:
+                py_compile.compile(str(path), doraise=True)
+            except py_compile.PyCompileError as e:
+                failures.append(f"{path.relative_to(PROJECT_ROOT)}: {e.msg.strip()}")
+
+    print(f"Compiled {checked} source files, {len(failures)} failed")
+    for failure in failures:
+        print(f"  ❌ {failure}")
+
+    assert not failures, f"{len(failures)} source files do not compile"
+    return True
+
+
+def main():
+    """Chạy kiểm tra compile"""
+    try:
+        test_sources_compile()
+    except AssertionError as e:
+        print(f"💥 {e}")
+        sys.exit(1)
+    print("✅ All source files compile")
+
+
+if __name__ == "__main__":
+    main()